@@ -0,0 +1,138 @@
+"""
+Random playouts of many Stonehenge games at once, as NumPy arrays.
+
+Every game starts from the same StonehengeState, so all games have the same
+player to move at each ply. Each ply, every game still going takes its next
+cell from its own random order of the empty cells, and the ley-line counts,
+claims and ends of all games are updated together.
+
+Example, 10000 playouts of a board of side length 4 after 'A':
+
+    python batch_rollout.py 4 A --games 10000
+
+NumPy is only needed by this module, and the rest of the games and
+strategies run without it.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import time
+from typing import Any
+from stonehenge import StonehengeState, get_ley_line_index
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def rollout(state: StonehengeState, games: int, rng: Any) -> tuple:
+    """
+    Return the board, winner and length of games random playouts from
+    state, using the numpy Generator rng.
+
+    The board is a games x cells array of the player holding each cell, 0
+    if nobody, 1 for p1 or 2 for p2. The winner of each game is 1 or 2, or
+    0 if it never ended, and its length is the moves played after state.
+
+    >>> board, winner, length = rollout(StonehengeState(True, 1), 4,
+    ...                                 np.random.default_rng(0))
+    >>> board.shape
+    (4, 3)
+    >>> winner.tolist(), length.tolist()
+    ([1, 1, 1, 1], [1, 1, 1, 1])
+    """
+    if np is None:
+        raise ImportError('batch rollouts need numpy')
+    index = get_ley_line_index(state.length)
+    cells = len(index.cell_lines)
+    lines = len(index.line_cells)
+    cell_lines = np.array(index.cell_lines, dtype=np.intp)
+    needs = np.array(index.line_needs, dtype=np.int8)
+
+    board = np.zeros((games, cells), dtype=np.int8)
+    for cell in range(cells):
+        if state.p1_cells >> cell & 1:
+            board[:, cell] = 1
+        elif state.p2_cells >> cell & 1:
+            board[:, cell] = 2
+    counts = np.tile(np.frombuffer(state.line_counts, dtype=np.int8)
+                     .reshape(lines, 2).T.copy(), (games, 1, 1))
+    owners = np.tile(np.frombuffer(state.ley_lines, dtype=np.int8),
+                     (games, 1))
+    claimed = np.tile(np.array([state.p1_claimed, state.p2_claimed],
+                               dtype=np.int16), (games, 1))
+    winner = np.zeros(games, dtype=np.int8)
+    length = np.zeros(games, dtype=np.int16)
+    if state.over:
+        winner[:] = 2 if state.p1_turn else 1
+        return board, winner, length
+
+    # each game plays the empty cells in its own random order
+    empty = np.flatnonzero(board[0] == 0)
+    order = empty[rng.random((games, len(empty))).argsort(axis=1)]
+    rows = np.arange(games)[:, None]
+    playing = np.ones(games, dtype=bool)
+    player = 0 if state.p1_turn else 1
+    for ply in range(len(empty)):
+        cell = order[:, ply]
+        board[playing, cell[playing]] = player + 1
+        cell_line = cell_lines[cell]
+        held = counts[rows, player, cell_line] + playing[:, None]
+        counts[rows, player, cell_line] = held
+        new = ((owners[rows, cell_line] == 0) & (held >= needs[cell_line])
+               & playing[:, None])
+        owners[rows, cell_line] |= new * np.int8(player + 1)
+        claimed[:, player] += new.sum(axis=1, dtype=np.int16)
+        won = playing & (2 * claimed[:, player] >= lines)
+        winner[won] = player + 1
+        length[won] = ply + 1
+        playing &= ~won
+        if not playing.any():
+            break
+        player = 1 - player
+    length[playing] = len(empty)
+    return board, winner, length
+
+
+def rollout_stats(state: StonehengeState, games: int = 10000,
+                  seed: int = None) -> dict:
+    """
+    Return the outcomes of games random playouts from state: the wins of
+    each player, the unfinished games, the score for the player to move at
+    state (1 a win, 0 a loss), the average moves played, and the seconds
+    taken and playouts per second.
+
+    >>> stats = rollout_stats(StonehengeState(True, 2), 1000, seed=0)
+    >>> stats['p1_wins'] + stats['p2_wins'] + stats['unfinished']
+    1000
+    >>> stats['p1_wins'] > stats['p2_wins']
+    True
+    """
+    start = time.perf_counter()
+    _, winner, length = rollout(state, games, np.random.default_rng(seed)
+                                if np is not None else None)
+    seconds = time.perf_counter() - start
+    p1_wins = int((winner == 1).sum())
+    p2_wins = int((winner == 2).sum())
+    wins = p1_wins if state.p1_turn else p2_wins
+    return {'games': games, 'p1_wins': p1_wins, 'p2_wins': p2_wins,
+            'unfinished': games - p1_wins - p2_wins,
+            'score': wins / games, 'mean_length': float(length.mean()),
+            'seconds': seconds,
+            'playouts_per_second': games / seconds if seconds else 0.0}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description='Play random Stonehenge '
+                                                 'games from a position.')
+    parser.add_argument('length', type=int)
+    parser.add_argument('moves', nargs='*', help='moves played so far')
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    position = StonehengeState(True, args.length)
+    for played in args.moves:
+        position = position.make_move(played)
+    print(json.dumps(rollout_stats(position, args.games, args.seed),
+                     indent=2))
@@ -0,0 +1,356 @@
+"""
+Benchmarks for the games and strategies.
+
+Every workload is fixed, so results can be compared between runs. Results
+are printed as JSON, and can be saved and compared against a saved baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable
+import stonehenge
+import strategy
+from stonehenge import StonehengeGame, StonehengeState
+from subtract_square_game import SubtractSquareGame
+from subtract_square_state import SubtractSquareState
+
+# Moves played before each fixed decision is timed, by game and size.
+STONEHENGE_OPENINGS = {1: [], 2: [], 3: ['A', 'L', 'F', 'E']}
+SUBTRACT_SQUARE_TOTALS = [30, 200, 400]
+
+# The unbounded itminimax keeps its whole tree, so it only gets the
+# decisions it can finish.
+ITMINIMAX_LIMITS = {'stonehenge': 3, 'subtract_square': 30}
+
+
+def stonehenge_positions(length: int, count: int = 50) -> list:
+    """
+    Return count unfinished Stonehenge positions of side length length,
+    reached by the same random games on every call.
+    """
+    generator = random.Random(length)
+    positions = []
+    while len(positions) < count:
+        state = StonehengeState(True, length)
+        while not state.over and len(positions) < count:
+            positions.append(state)
+            state = state.make_move(
+                generator.choice(state.get_possible_moves()))
+    return positions
+
+
+def best_times(workloads: list, rounds: int, duration: float) -> dict:
+    """
+    Return the fastest time of one call of each operation in workloads, a
+    list of (name, operation, ops), in seconds by name.
+
+    As with timeit, garbage collection is off while timing, and each timing
+    calls an operation as many times as it takes to last at least duration
+    seconds, so short workloads are not lost in timer noise. Every workload
+    is timed once in each of rounds rounds, so a burst of other work on the
+    machine slows down one round of a few workloads rather than every
+    timing of one. Such work only ever slows a timing down, so the fastest
+    timing is the one least disturbed by it.
+    """
+    timers = [(name, timeit.Timer(operation))
+              for name, operation, _ in workloads]
+    numbers = {name: calls_lasting(timer, duration) for name, timer in timers}
+    best = {}
+    for _ in range(rounds):
+        for name, timer in timers:
+            seconds = timer.timeit(numbers[name]) / numbers[name]
+            best[name] = min(best.get(name, seconds), seconds)
+    return best
+
+
+def calls_lasting(timer: timeit.Timer, duration: float) -> int:
+    """
+    Return the first of 1, 2, 5, 10, 20, 50 and so on calls of the operation
+    of timer that take at least duration seconds, as timeit's autorange
+    does for 0.2 seconds.
+    """
+    base = 1
+    while True:
+        for number in [base, 2 * base, 5 * base]:
+            if timer.timeit(number) >= duration:
+                return number
+        base *= 10
+
+
+def peak_memory(operation: Callable) -> int:
+    """
+    Return the peak memory in bytes allocated while running operation().
+    """
+    tracemalloc.start()
+    try:
+        operation()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def count_nodes(operation: Callable) -> int:
+    """
+    Return the number of make_move and apply_move calls on both state
+    classes while running operation().
+    """
+    calls = [0]
+    originals = []
+    for cls in [StonehengeState, SubtractSquareState]:
+        for name in ['make_move', 'apply_move']:
+            original = getattr(cls, name)
+            originals.append((cls, name, original))
+            setattr(cls, name, counted(original, calls))
+    try:
+        operation()
+    finally:
+        for cls, name, original in originals:
+            setattr(cls, name, original)
+    return calls[0]
+
+
+def counted(method: Callable, calls: list) -> Callable:
+    """
+    Return method, wrapped to add one to calls[0] on every call.
+    """
+    def wrapper(*args, **kwargs):
+        calls[0] += 1
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def state_workloads() -> list:
+    """
+    Return (name, operation, ops) for every state operation workload, where
+    one call of operation performs ops operations.
+    """
+    workloads = []
+    for length in range(1, 6):
+        positions = stonehenge_positions(length)
+        moves = [(state, state.get_possible_moves()[0])
+                 for state in positions]
+        prefix = 'stonehenge[{}].'.format(length)
+        workloads.append((prefix + 'make_move', lambda m=moves: [
+            state.make_move(move) for state, move in m], len(moves)))
+        workloads.append((prefix + 'get_possible_moves', lambda p=positions: [
+            state.get_possible_moves() for state in p], len(positions)))
+        workloads.append((prefix + 'rough_outcome', lambda p=positions:
+                          cold_rough_outcomes(p), len(positions)))
+        workloads.append((prefix + '__str__', lambda p=positions: [
+            str(state) for state in p], len(positions)))
+    for total in [10, 100, 1000, 10000]:
+        positions = [SubtractSquareState(True, total - i) for i in range(10)]
+        prefix = 'subtract_square[{}].'.format(total)
+        workloads.append((prefix + 'get_possible_moves', lambda p=positions: [
+            state.get_possible_moves() for state in p], len(positions)))
+        workloads.append((prefix + 'rough_outcome', lambda p=positions: [
+            state.rough_outcome() for state in p], len(positions)))
+    return workloads
+
+
+def decision_workloads() -> list:
+    """
+    Return (name, operation, ops) for every strategy decision workload. Each
+    operation starts from an empty transposition table.
+    """
+    games = []
+    for length, opening in STONEHENGE_OPENINGS.items():
+        games.append(('stonehenge', length, lambda n=length, o=opening:
+                      opened(StonehengeGame(True, n), o)))
+    for total in SUBTRACT_SQUARE_TOTALS:
+        games.append(('subtract_square', total,
+                      lambda t=total: SubtractSquareGame(True, t)))
+
+    workloads = []
+    for kind, size, make_game in games:
+        for current_strategy in [strategy.reminimax, strategy.itminimax,
+                                 strategy.rough_outcome_strategy]:
+            if (current_strategy is strategy.itminimax
+                    and size > ITMINIMAX_LIMITS[kind]):
+                continue
+            name = '{}[{}].{}'.format(kind, size, current_strategy.__name__)
+            workloads.append((name, lambda g=make_game, s=current_strategy:
+                              cold_decision(g(), s), 1))
+    return workloads
+
+
+def opened(game: Any, opening: list) -> Any:
+    """
+    Return game after playing the moves in opening.
+    """
+    for move in opening:
+        game.current_state = game.current_state.make_move(move)
+    return game
+
+
+def cold_rough_outcomes(positions: list) -> list:
+    """
+    Return the rough_outcome of every Stonehenge state in positions,
+    starting from an empty cache of rough outcomes.
+    """
+    stonehenge.ROUGH_OUTCOMES.clear()
+    return [state.rough_outcome() for state in positions]
+
+
+def cold_decision(game: Any, current_strategy: Callable) -> Any:
+    """
+    Return the move current_strategy picks for game, starting from an empty
+    transposition table and cache of Stonehenge rough outcomes.
+    """
+    strategy.TABLE.clear()
+    stonehenge.ROUGH_OUTCOMES.clear()
+    return current_strategy(game)
+
+
+def run(quick: bool = False) -> dict:
+    """
+    Run every workload and return its operations per second, nodes per
+    second and peak memory in bytes, by workload name.
+
+    Every workload is timed as the fastest of twenty rounds of timings of
+    at least 0.05 seconds each, or of ten rounds of at least 0.02 seconds
+    if quick is True. Many short rounds spread over the whole run leave
+    some rounds of every workload undisturbed by bursts of other work on
+    the machine.
+    """
+    workloads = state_workloads() + decision_workloads()
+    if quick:
+        times = best_times(workloads, 10, 0.02)
+    else:
+        times = best_times(workloads, 20, 0.05)
+    results = {}
+    for name, operation, ops in workloads:
+        seconds = times[name]
+        nodes = count_nodes(operation)
+        results[name] = {'ops_per_sec': ops / seconds,
+                         'nodes_per_sec': nodes / seconds,
+                         'peak_bytes': peak_memory(operation)}
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.3) -> list:
+    """
+    Return a description of every workload in results that is more than
+    tolerance slower, or uses more than tolerance more memory, than in
+    baseline.
+
+    A busy machine can run every workload a third slower or faster from one
+    run to the next, so speeds are compared after taking out the
+    speed_change of all workloads. A change that slows every workload alike
+    is not flagged, but shows in speed_change.
+
+    >>> compare({'a': {'ops_per_sec': 30.0, 'peak_bytes': 100},
+    ...          'b': {'ops_per_sec': 50.0, 'peak_bytes': 100},
+    ...          'c': {'ops_per_sec': 50.0, 'peak_bytes': 100}},
+    ...         {'a': {'ops_per_sec': 100.0, 'peak_bytes': 100},
+    ...          'b': {'ops_per_sec': 100.0, 'peak_bytes': 100},
+    ...          'c': {'ops_per_sec': 100.0, 'peak_bytes': 100}})
+    ['a: ops_per_sec 100.0 -> 30.0 (-70.0%, -40.0% against the median)']
+    """
+    change = speed_change(results, baseline)
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        new = results[name]
+        ratio = new['ops_per_sec'] / old['ops_per_sec']
+        if ratio < change * (1 - tolerance):
+            regressions.append(
+                '{}: ops_per_sec {} -> {} ({:+.1f}%, {:+.1f}% against the '
+                'median)'.format(name, old['ops_per_sec'],
+                                 new['ops_per_sec'], 100 * (ratio - 1),
+                                 100 * (ratio / change - 1)))
+        if new['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            regressions.append('{}: peak_bytes {} -> {} ({:+.1f}%)'.format(
+                name, old['peak_bytes'], new['peak_bytes'],
+                100 * (new['peak_bytes'] / old['peak_bytes'] - 1)))
+    return regressions
+
+
+def speed_change(results: dict, baseline: dict) -> float:
+    """
+    Return the median ratio of the speed of a workload in results to its
+    speed in baseline, or 1.0 if they share no workload.
+
+    >>> speed_change({'a': {'ops_per_sec': 50.0}, 'b': {'ops_per_sec': 9.0}},
+    ...              {'a': {'ops_per_sec': 100.0}, 'b': {'ops_per_sec': 10.0}})
+    0.7
+    """
+    ratios = [results[name]['ops_per_sec'] / baseline[name]['ops_per_sec']
+              for name in results if name in baseline]
+    if not ratios:
+        return 1.0
+    return statistics.median(ratios)
+
+
+def measure_scaling(game: Any, worker_counts: tuple = (1, 2, 4, 8, 16)) \
+        -> dict:
+    """
+    Return how long parallel_minimax takes to pick a move in game with each
+    number of workers in worker_counts, and its speedup over the first.
+
+    Every run starts from fresh worker processes and an empty transposition
+    table, so no run benefits from an earlier one.
+    """
+    results = {}
+    baseline = None
+    for workers in worker_counts:
+        for pool in strategy.POOLS.values():
+            pool.shutdown()
+        strategy.POOLS.clear()
+        strategy.TABLE.clear()
+        start = time.perf_counter()
+        move = strategy.parallel_minimax(game, workers)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = seconds
+        results[workers] = {'seconds': seconds, 'speedup': baseline / seconds,
+                            'move': move}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the games and '
+                                                 'strategies.')
+    parser.add_argument('--quick', action='store_true',
+                        help='time every workload in shorter rounds')
+    parser.add_argument('--output', help='save the results to this file')
+    parser.add_argument('--baseline', help='compare with results saved '
+                                           'in this file')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='fraction a workload may worsen before it is '
+                             'flagged (default 0.3)')
+    parser.add_argument('--scaling', type=int, metavar='LENGTH',
+                        help='only time parallel_minimax on an empty '
+                             'Stonehenge board of this side length')
+    args = parser.parse_args()
+
+    if args.scaling is not None:
+        print(json.dumps(measure_scaling(StonehengeGame(True, args.scaling)),
+                         indent=2))
+        sys.exit(0)
+
+    report = {'python': sys.version.split()[0], 'results': run(args.quick)}
+    if args.baseline:
+        with open(args.baseline) as file:
+            saved = json.load(file)['results']
+        report['speed_change'] = speed_change(report['results'], saved)
+        report['regressions'] = compare(report['results'], saved,
+                                        args.tolerance)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+    if report.get('regressions'):
+        sys.exit(1)
@@ -0,0 +1,249 @@
+"""
+Depth-first proof-number search (df-pn) for two-outcome games.
+
+df-pn proves whether the player to move can force a win, growing the proof
+where it looks cheapest to finish. This lets it solve positions that
+minimax cannot finish. It works on any game whose states provide
+get_possible_moves, make_move, winner, winning_moves and get_key.
+
+Only games without draws can be solved, such as Stonehenge and Subtract
+Square. A drawn position would have to count as lost for one player and not
+won for the other, but df-pn here scores every position for its player to
+move, so a finished game without a winner raises ValueError instead.
+
+Example, solving a Stonehenge opening:
+
+    >>> from stonehenge import StonehengeState
+    >>> result = solve(StonehengeState(True, 2))
+    >>> (result['value'], result['move'])
+    (1, 'G')
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import math
+import time
+from typing import Any
+from transposition import TranspositionTable
+
+INFINITY = float('inf')
+
+# How far past the second best child a child is searched before switching,
+# as a fraction of the second best child's disproof number (the "1 + epsilon
+# trick"). Switching less often saves re-expanding the same positions.
+EPSILON = 0.25
+
+
+class SearchStopped(Exception):
+    """
+    Raised when the stop event of a DfpnSolver is set during a search.
+    """
+
+
+class DfpnSolver:
+    """
+    A df-pn solver with a bounded table of proof and disproof numbers.
+
+    The proof number of a position is how many more positions must be
+    proven won for its player to move to prove it won, and the disproof
+    number is how many must be proven lost to prove it lost. A proven win
+    has proof number 0, and a proven loss disproof number 0.
+
+    Attribute:
+    table: (proof number, disproof number) of positions, by get_key
+    nodes: the number of positions searched so far
+    stats: the instrumentation.SearchStats positions are counted in, or
+           None
+    stop: a threading.Event that stops the search with SearchStopped once
+          it is set, or None
+    """
+    table: TranspositionTable
+    nodes: int
+    stats: Any
+    stop: Any
+
+    def __init__(self, max_size: int = 1000000) -> None:
+        """
+        Initialize a solver that keeps at most max_size positions.
+        """
+        self.table = TranspositionTable(max_size)
+        self.nodes = 0
+        self.stats = None
+        self.stop = None
+
+    def solve(self, state: Any) -> dict:
+        """
+        Return the value of state for its player to move (WIN or LOSE), a
+        best move, the number of distinct positions in the proof, the
+        number of positions searched and the seconds taken.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> result = DfpnSolver().solve(SubtractSquareState(True, 28))
+        >>> (result['value'], result['move'])
+        (1, 16)
+        """
+        start = time.perf_counter()
+        nodes = self.nodes
+        proof, _ = self.prove(state)
+        value = state.WIN if proof == 0 else state.LOSE
+        return {'value': value, 'move': self.best_move(state),
+                'proof_size': self.proof_size(state),
+                'nodes': self.nodes - nodes,
+                'seconds': time.perf_counter() - start}
+
+    def prove(self, state: Any, ply: int = 0) -> tuple:
+        """
+        Return the (proof number, disproof number) of state, ply moves below
+        the position being decided on, once it is proven won or lost.
+        """
+        numbers = self.numbers(state, ply)
+        if numbers[0] != 0 and numbers[1] != 0:
+            self.search(state, INFINITY, INFINITY, ply)
+            numbers = self.table.peek(state.get_key())
+        return numbers
+
+    def numbers(self, state: Any, ply: int = 0) -> tuple:
+        """
+        Return the (proof number, disproof number) of state, ply moves below
+        the position being decided on, known so far.
+
+        Finished games and positions with a winning move are proven without
+        searching, and any other new position counts as (1, 1).
+
+        >>> from stonehenge import StonehengeState
+        >>> DfpnSolver().numbers(StonehengeState(True, 1))
+        (0, inf)
+        """
+        stats = self.stats
+        numbers = self.table.get(state.get_key())
+        if numbers is not None:
+            return numbers
+        winner = state.winner()
+        if winner is not None or state.get_possible_moves() == []:
+            if stats is not None:
+                stats.terminal(ply)
+            if winner is None:
+                raise ValueError('df-pn cannot solve games with draws')
+            if winner == state.get_current_player_name():
+                return 0, INFINITY
+            return INFINITY, 0
+        if stats is not None:
+            stats.leaf(ply)
+        if state.winning_moves() != []:
+            return 0, INFINITY
+        return 1, 1
+
+    def search(self, state: Any, proof_limit: float,
+               disproof_limit: float, ply: int = 0) -> None:
+        """
+        Search state, ply moves below the position being decided on, until
+        its proof number reaches proof_limit or its disproof number reaches
+        disproof_limit, and store its numbers.
+
+        A position is won if some child is lost for its player, so its
+        proof number is the smallest disproof number of its children and
+        its disproof number is the sum of their proof numbers.
+        """
+        stats = self.stats
+        if self.stop is not None and self.stop.is_set():
+            raise SearchStopped
+        self.nodes += 1
+        children = [state.make_move(move)
+                    for move in state.get_possible_moves()]
+        if stats is not None:
+            stats.expand(ply, len(children))
+            stats.make_moves += len(children)
+        keys = [child.get_key() for child in children]
+        # numbers of children not in the table yet only need computing once
+        initial = [self.numbers(child, ply + 1) for child in children]
+        while True:
+            child_numbers = [self.table.peek(key, numbers)
+                             for key, numbers in zip(keys, initial)]
+            proof = min(numbers[1] for numbers in child_numbers)
+            disproof = sum(numbers[0] for numbers in child_numbers)
+            if proof >= proof_limit or disproof >= disproof_limit:
+                break
+            # search the child closest to being lost for its player, until
+            # it passes the second closest or the limits of state
+            best = 0
+            second = INFINITY
+            for i in range(1, len(children)):
+                if child_numbers[i][1] < child_numbers[best][1]:
+                    second = child_numbers[best][1]
+                    best = i
+                elif child_numbers[i][1] < second:
+                    second = child_numbers[i][1]
+            if second < INFINITY:
+                second = math.ceil(second * (1 + EPSILON))
+            self.search(children[best],
+                        disproof_limit - disproof + child_numbers[best][0],
+                        min(proof_limit, second + 1), ply + 1)
+        self.table.put(state.get_key(), (proof, disproof))
+
+    def best_move(self, state: Any) -> Any:
+        """
+        Return a move to a child of state that is lost for its player, or
+        the first move if state is lost.
+
+        Children already proven lost are preferred, so only a child whose
+        proof was dropped from the table is searched again.
+        """
+        moves = state.get_possible_moves()
+        if moves == [] or self.prove(state)[0] != 0:
+            return moves[0] if moves else None
+        winning = state.winning_moves()
+        if winning != []:
+            return winning[0]
+        for move in moves:
+            if self.numbers(state.make_move(move), 1)[1] == 0:
+                return move
+        for move in moves:
+            if self.prove(state.make_move(move), 1)[1] == 0:
+                return move
+        return None
+
+    def proof_size(self, state: Any) -> int:
+        """
+        Return the number of distinct positions in the proof of the proven
+        state: one losing reply below each won position, and every reply
+        below each lost position.
+        """
+        seen = set()
+        pending = [state]
+        while pending:
+            state = pending.pop()
+            if state.get_key() in seen:
+                continue
+            seen.add(state.get_key())
+            if state.winner() is not None or state.get_possible_moves() == []:
+                continue
+            if self.prove(state)[0] == 0:
+                pending.append(state.make_move(self.best_move(state)))
+            else:
+                pending.extend(state.make_move(move)
+                               for move in state.get_possible_moves())
+        return len(seen)
+
+
+def solve(state: Any, max_size: int = 1000000) -> dict:
+    """
+    Return the value, best move, proof size, positions searched and seconds
+    taken for state, as DfpnSolver.solve, with a new solver keeping at most
+    max_size positions.
+    """
+    return DfpnSolver(max_size).solve(state)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from stonehenge import StonehengeState
+    parser = argparse.ArgumentParser(description='Solve a Stonehenge '
+                                                 'position with df-pn.')
+    parser.add_argument('length', type=int)
+    parser.add_argument('moves', nargs='*', help='moves played so far')
+    parser.add_argument('--max-size', type=int, default=1000000)
+    args = parser.parse_args()
+    position = StonehengeState(True, args.length)
+    for played in args.moves:
+        position = position.make_move(played)
+    print(json.dumps(solve(position, args.max_size), indent=2))
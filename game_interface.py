@@ -6,13 +6,17 @@ Note: You do not have to run python_ta on this file.
 You may import your games from A1 (i.e. Chopsticks). However, the minimax
 strategy cannot be used on Chopsticks unless you account for infinite loops.
 (You do not have to worry about this for the assignment: only do it for
-your own curiousity!)
+your own curiousity!) The 'mg' strategy, cycle_minimax, does: it scores a
+position repeated on the line of play as a draw and expands a bounded
+number of positions per move.
 """
 # TODO: import the modules needed to make game_interface run.
 from strategy import *
 from typing import Any, Callable
 from subtract_square_game import SubtractSquareGame
 from stonehenge import StonehengeGame
+from instrumentation import run_instrumented
+from ponder import Ponderer
 
 # TODO: Replace None with the corresponding class name for your games.
 # 'h' should map to Stonehenge.
@@ -22,10 +26,29 @@ playable_games = {'s': SubtractSquareGame,
 # TODO: Replace None with the corresponding function names for your strategies.
 # 'mr' should map to your recursive implementation of minimax while
 # 'mi' should map to your iterative implementation of minimax
+# 'ma' maps to minimax with alpha-beta pruning
+# 'sq' maps to the Subtract Square win table (alpha-beta for other games)
+# 'mt' maps to iterative deepening minimax with a time limit per move
+# 'mp' maps to minimax that searches the next moves in parallel processes
+# 'mc' maps to Monte Carlo tree search
+# 'ob' maps to the opening book written by opening_book.py
+# 'pn' maps to the df-pn proof-number solver
+# 'mg' maps to minimax for games where positions can repeat
 usable_strategies = {'i': interactive_strategy,
                      'ro': rough_outcome_strategy,
                      'mr': reminimax,
-                     'mi': itminimax}
+                     'mi': itminimax,
+                     'ma': abminimax,
+                     'sq': solved_strategy,
+                     'mt': timed_minimax,
+                     'mp': parallel_minimax,
+                     'mc': mcts_strategy,
+                     'ob': book_strategy,
+                     'pn': dfpn_strategy,
+                     'mg': cycle_minimax}
+
+# Strategies that take a time limit in seconds for each move.
+timed_strategies = [timed_minimax, mcts_strategy]
 
 
 class GameInterface:
@@ -35,7 +58,8 @@ class GameInterface:
     """
 
     def __init__(self, game: Any, p1_strategy: Callable,
-                 p2_strategy: Callable[[Any], Any]) -> None:
+                 p2_strategy: Callable[[Any], Any],
+                 p1_options: dict = None, p2_options: dict = None) -> None:
         """
         Initialize this GameInterface, setting its active game to game, and
         using the strategies p1_strategy for Player 1 and p2_strategy for
@@ -47,6 +71,11 @@ class GameInterface:
         :type p1_strategy:
         :param p2_strategy: The strategy for Play 2.
         :type p2_strategy:
+        :param p1_options: Keyword arguments for p1_strategy, such as
+                           time_limit.
+        :type p1_options: dict
+        :param p2_options: Keyword arguments for p2_strategy.
+        :type p2_options: dict
         """
         first_player = input("Type y if player 1 is to make the first move: ")
         is_p1_turn = False
@@ -56,12 +85,22 @@ class GameInterface:
         self.game = game(is_p1_turn)
         self.p1_strategy = p1_strategy
         self.p2_strategy = p2_strategy
+        self.p1_options = p1_options or {}
+        self.p2_options = p2_options or {}
 
-    def play(self) -> None:
+    def play(self, hook: Callable = None, ponder: bool = False) -> None:
         """
         Play the game.
+
+        If hook is given, every strategy decision is instrumented and hook
+        is called with its SearchStats, e.g. instrumentation.print_stats.
+        If ponder is True, a bot playing against a human searches its
+        replies while the human picks a move. Replies found that way are
+        played at once and are not instrumented, and neither are the
+        human's moves made while the bot ponders.
         """
         current_state = self.game.current_state
+        ponderer = None
 
         print(self.game.get_instructions())
         print(current_state)
@@ -76,12 +115,33 @@ class GameInterface:
             for move in possible_moves:
                 print(move)
 
-            # Pick a (legal) move.
+            current_strategy = self.p2_strategy
+            options = self.p2_options
+            other_strategy = self.p1_strategy
+            other_options = self.p1_options
+            if current_state.get_current_player_name() == 'p1':
+                current_strategy, other_strategy = (other_strategy,
+                                                    current_strategy)
+                options, other_options = other_options, options
+
+            # Ponder while a human plays a bot, or use the pondered reply.
+            if ponderer is not None:
+                move_to_make = ponderer.finish(current_state)
+                ponderer = None
+            elif (ponder and current_strategy is interactive_strategy
+                  and other_strategy is not interactive_strategy):
+                ponderer = Ponderer(self.game, other_strategy, other_options)
+                ponderer.start(current_state)
+
+            # Pick a (legal) move. A turn played while the bot ponders is
+            # not instrumented, as the pondering shares its cache.
             while not current_state.is_valid_move(move_to_make):
-                current_strategy = self.p2_strategy
-                if current_state.get_current_player_name() == 'p1':
-                    current_strategy = self.p1_strategy
-                move_to_make = current_strategy(self.game)
+                if hook is None or ponderer is not None:
+                    move_to_make = current_strategy(self.game, **options)
+                else:
+                    move_to_make, stats = run_instrumented(
+                        current_strategy, self.game, **options)
+                    hook(stats)
 
             # Apply the move
             current_player_name = current_state.get_current_player_name()
@@ -93,6 +153,9 @@ class GameInterface:
                 current_player_name, move_to_make))
             print(current_state)
 
+        if ponderer is not None:
+            ponderer.finish(current_state)
+
         # Print out the winner of the game
         if self.game.is_winner("p1"):
             print("Player 1 is the winner!")
@@ -127,5 +190,23 @@ if __name__ == '__main__':
     while p2 not in usable_strategies.keys():
         p2 = input("Select the strategy for Player 2 ({}): ".format(strategies))
 
+    chosen_options = []
+    for name, key in [('Player 1', p1), ('Player 2', p2)]:
+        options = {}
+        if usable_strategies[key] in timed_strategies:
+            options['time_limit'] = float(input(
+                "Enter the seconds {} may think per move: ".format(name)))
+        if usable_strategies[key] is book_strategy:
+            options['path'] = input(
+                "Enter the opening book file for {}: ".format(name))
+        chosen_options.append(options)
+
+    pondering = False
+    if (interactive_strategy in [usable_strategies[p1], usable_strategies[p2]]
+            and usable_strategies[p1] is not usable_strategies[p2]):
+        pondering = input("Type y to let the computer think during your "
+                          "turns: ").lower() == 'y'
+
     GameInterface(playable_games[chosen_game], usable_strategies[p1],
-                  usable_strategies[p2]).play()
+                  usable_strategies[p2], chosen_options[0],
+                  chosen_options[1]).play(ponder=pondering)
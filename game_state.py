@@ -15,6 +15,7 @@ class GameState:
     DRAW - score if player is in a tied position
     p1_turn - whether it is p1's turn or not
     """
+    __slots__ = ('p1_turn',)
     WIN: int = 1
     LOSE: int = -1
     DRAW: int = 0
@@ -55,6 +56,19 @@ class GameState:
         """
         raise NotImplementedError
 
+    def apply_move(self, move: Any) -> None:
+        """
+        Apply move to this GameState in place, remembering enough to take it
+        back with undo_move.
+        """
+        raise NotImplementedError
+
+    def undo_move(self) -> None:
+        """
+        Take back the last move applied by apply_move.
+        """
+        raise NotImplementedError
+
     def is_valid_move(self, move: Any) -> bool:
         """
         Return whether move is a valid move for this GameState.
@@ -68,6 +82,21 @@ class GameState:
         """
         raise NotImplementedError
 
+    def get_key(self) -> Any:
+        """
+        Return a hashable key identifying this state, so that positions
+        reached through different move orders share search results.
+        """
+        raise NotImplementedError
+
+    def get_canonical_key(self) -> Any:
+        """
+        Return a key shared by this state and every state symmetric to it,
+        which have the same value. By default a state is only symmetric to
+        itself.
+        """
+        return self.get_key()
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -75,6 +104,26 @@ class GameState:
         """
         raise NotImplementedError
 
+    def is_terminal(self) -> bool:
+        """
+        Return whether the game is over at this state.
+        """
+        raise NotImplementedError
+
+    def winner(self) -> Any:
+        """
+        Return the name of the player who has won at this state, or None if
+        nobody has won.
+        """
+        raise NotImplementedError
+
+    def winning_moves(self) -> list:
+        """
+        Return the possible moves that win the game for the current player
+        at once.
+        """
+        raise NotImplementedError
+
 
 if __name__ == "__main__":
     from python_ta import check_all
@@ -0,0 +1,222 @@
+"""
+A token game on a directed graph, whose positions can repeat.
+
+Players take turns moving a token along an edge, and a player who cannot
+move loses. Random graphs of a few nodes have cycles, so they test the
+searches for games with repeated positions, such as strategy.cycle_minimax,
+against repetition_value, an exhaustive search without any caching.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import random
+from typing import Any
+from game import Game
+from game_state import GameState
+
+
+class GraphGame(Game):
+    """
+    A game of moving a token along the edges of a directed graph.
+    """
+
+    def __init__(self, p1_starts: bool, edges: tuple = None,
+                 start: int = 0) -> None:
+        """
+        Initialize a game with the token on node start, where edges[i] is the
+        tuple of nodes node i has an edge to. A random graph of 6 nodes is
+        used if edges is not given.
+
+        >>> game = GraphGame(True, ((1, 2), (0,), ()))
+        >>> game.current_state.get_possible_moves()
+        [1, 2]
+        """
+        if edges is None:
+            edges = random_graph(6)
+        self.current_state = GraphState(p1_starts, edges, start)
+
+    def get_instructions(self) -> str:
+        """
+        Return the instructions for this Game.
+        """
+        return ('Players take turns moving the token along an edge of the '
+                'graph. The player who cannot move loses.')
+
+    def is_over(self, state: 'GraphState') -> bool:
+        """
+        Return whether the game is over at state.
+        """
+        return state.is_terminal()
+
+    def is_winner(self, player: str) -> bool:
+        """
+        Return whether player has won the game.
+        """
+        return self.current_state.winner() == player
+
+    def str_to_move(self, string: str) -> Any:
+        """
+        Return the move that string represents, or -1 if it is not a node.
+        """
+        if not string.strip().isdigit():
+            return -1
+        return int(string.strip())
+
+
+class GraphState(GameState):
+    """
+    The position of the token on a directed graph.
+
+    Attribute:
+    edges: the nodes each node has an edge to
+    node: the node the token is on
+    """
+    __slots__ = ('edges', 'node')
+    edges: tuple
+    node: int
+
+    def __init__(self, is_p1_turn: bool, edges: tuple, node: int) -> None:
+        """
+        Initialize the token on node of the graph with edges.
+        """
+        super().__init__(is_p1_turn)
+        self.edges = edges
+        self.node = node
+
+    def __str__(self) -> str:
+        """
+        Return the node of the token and where it can go.
+
+        >>> print(GraphState(True, ((1, 2), (0,), ()), 0))
+        p1 at 0, moves [1, 2]
+        """
+        return '{} at {}, moves {}'.format(self.get_current_player_name(),
+                                           self.node,
+                                           self.get_possible_moves())
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of self.
+        """
+        return 'GraphState({}, {}, {})'.format(self.p1_turn, self.edges,
+                                               self.node)
+
+    def get_possible_moves(self) -> list:
+        """
+        Return the nodes the token can move to.
+        """
+        return list(self.edges[self.node])
+
+    def make_move(self, move: int) -> 'GraphState':
+        """
+        Return the state after moving the token to node move.
+        """
+        return GraphState(not self.p1_turn, self.edges, move)
+
+    def get_key(self) -> tuple:
+        """
+        Return a key identifying self among the states of every graph.
+
+        Both players have the same moves, so the score of a state does not
+        depend on whose turn it is, and the key leaves the turn out. The
+        token coming back to a node is a repetition whoever moves next.
+        """
+        return self.edges, self.node
+
+    def rough_outcome(self) -> float:
+        """
+        Return a guess of the score of self: WIN if the player to move can
+        win at once, otherwise DRAW.
+        """
+        if self.winning_moves() != []:
+            return self.WIN
+        return self.DRAW
+
+    def is_terminal(self) -> bool:
+        """
+        Return whether the player to move is stuck.
+        """
+        return self.edges[self.node] == ()
+
+    def winner(self) -> Any:
+        """
+        Return the player who just moved if the player to move is stuck,
+        otherwise None.
+        """
+        if not self.is_terminal():
+            return None
+        return 'p2' if self.p1_turn else 'p1'
+
+    def winning_moves(self) -> list:
+        """
+        Return the moves that leave the opponent stuck.
+
+        >>> GraphState(True, ((1, 2), (0,), ()), 0).winning_moves()
+        [2]
+        """
+        return [move for move in self.edges[self.node]
+                if self.edges[move] == ()]
+
+
+def random_graph(nodes: int, rng: random.Random = random) -> tuple:
+    """
+    Return the edges of a random directed graph of nodes nodes, where each
+    node has up to four edges and about one in five has none.
+    """
+    return tuple(() if rng.random() < 0.2
+                 else tuple(sorted(rng.sample(range(nodes),
+                                              rng.randint(1, 4))))
+                 for _ in range(nodes))
+
+
+def repetition_value(state: GraphState, path: frozenset = frozenset()) -> int:
+    """
+    Return the score of state for its player to move, where a position that
+    repeats one in path, or one on the line of play from state, is a draw.
+    Every line of play is searched, and nothing is cached.
+
+    >>> repetition_value(GraphState(True, ((1,), (0,)), 0))
+    0
+    >>> repetition_value(GraphState(True, ((1, 2), (0,), ()), 0))
+    1
+    """
+    key = state.get_key()
+    if key in path:
+        return state.DRAW
+    if state.is_terminal():
+        return state.LOSE
+    path = path | {key}
+    return max(-1 * repetition_value(state.make_move(move), path)
+               for move in state.get_possible_moves())
+
+
+def replay_errors(strategy: Any, graphs: int, nodes: int = 8,
+                  seed: int = 0) -> list:
+    """
+    Return the decisions strategy gets wrong in random graphs of nodes
+    nodes, as (edges, node, move) tuples. Every state of each of graphs
+    graphs is decided on, in a random order.
+
+    A decision is wrong when its move scores worse than the best move by
+    repetition_value. Strategy caches are kept between decisions, as they
+    are between the moves of a real game.
+
+    >>> from strategy import cycle_minimax
+    >>> replay_errors(cycle_minimax, 100, seed=3)
+    []
+    """
+    rng = random.Random(seed)
+    errors = []
+    for _ in range(graphs):
+        edges = random_graph(nodes, rng)
+        states = [GraphState(p1_turn, edges, node) for node in range(nodes)
+                  for p1_turn in [True, False] if edges[node] != ()]
+        rng.shuffle(states)
+        for state in states:
+            game = GraphGame(state.p1_turn, edges, state.node)
+            scores = {move: -1 * repetition_value(state.make_move(move),
+                                                  frozenset([state.get_key()]))
+                      for move in state.get_possible_moves()}
+            move = strategy(game)
+            if scores[move] < max(scores.values()):
+                errors.append((edges, state.node, move))
+    return errors
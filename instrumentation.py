@@ -0,0 +1,192 @@
+"""
+Opt-in statistics about the search behind each move of a strategy.
+
+Strategies only count while strategy.SEARCH.stats holds a SearchStats,
+which run_instrumented sets for the length of one decision in the thread
+making it. Otherwise each counting point in strategy.py costs a single
+comparison with None.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import time
+from typing import Any, Callable
+import strategy
+
+
+class SearchStats:
+    """
+    Statistics of the search for one move.
+
+    Attribute:
+    strategy: the name of the strategy
+    player: the player who moved, 'p1' or 'p2'
+    move: the move picked
+    nodes: positions the search looked at, not counting cache hits
+    expanded: positions whose moves were searched
+    terminals: positions where the game was over
+    children: moves generated at expanded positions
+    max_depth: the most moves below the current state searched
+    make_moves: make_move and apply_move calls made by the strategy
+    playouts: random playouts, for Monte Carlo search
+    cache_hits: lookups of cached scores that found one
+    cache_misses: lookups of cached scores that found nothing
+    seconds: wall time of the decision
+    """
+    strategy: str
+    player: str
+    move: Any
+    nodes: int
+    expanded: int
+    terminals: int
+    children: int
+    max_depth: int
+    make_moves: int
+    playouts: int
+    cache_hits: int
+    cache_misses: int
+    seconds: float
+
+    def __init__(self, strategy_name: str, player: str = None) -> None:
+        """
+        Initialize empty statistics for a move of player by the strategy
+        named strategy_name.
+
+        >>> stats = SearchStats('reminimax')
+        >>> (stats.nodes, stats.branching_factor())
+        (0, 0.0)
+        """
+        self.strategy = strategy_name
+        self.player = player
+        self.move = None
+        self.nodes = 0
+        self.expanded = 0
+        self.terminals = 0
+        self.children = 0
+        self.max_depth = 0
+        self.make_moves = 0
+        self.playouts = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.seconds = 0.0
+
+    def expand(self, ply: int, children: int) -> None:
+        """
+        Record a position ply moves below the current state whose children
+        moves are searched.
+
+        >>> stats = SearchStats('reminimax')
+        >>> stats.expand(0, 3)
+        >>> stats.expand(1, 2)
+        >>> stats.terminal(2)
+        >>> (stats.nodes, stats.max_depth, stats.branching_factor())
+        (3, 2, 2.5)
+        """
+        self.nodes += 1
+        self.expanded += 1
+        self.children += children
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def terminal(self, ply: int) -> None:
+        """
+        Record a position ply moves below the current state where the game
+        is over.
+        """
+        self.nodes += 1
+        self.terminals += 1
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def leaf(self, ply: int) -> None:
+        """
+        Record a position ply moves below the current state that is scored
+        without searching further.
+        """
+        self.nodes += 1
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def lookup(self, value: Any) -> None:
+        """
+        Record a cache lookup that found value, or nothing if value is None,
+        in a cache that does not count its own lookups.
+
+        >>> stats = SearchStats('timed_minimax')
+        >>> stats.lookup(1)
+        >>> stats.lookup(None)
+        >>> (stats.cache_hits, stats.cache_misses)
+        (1, 1)
+        """
+        if value is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+
+    def branching_factor(self) -> float:
+        """
+        Return the average number of moves at expanded positions.
+        """
+        if self.expanded == 0:
+            return 0.0
+        return self.children / self.expanded
+
+    def as_dict(self) -> dict:
+        """
+        Return the statistics as a dictionary, for logging.
+        """
+        result = dict(vars(self))
+        result['branching_factor'] = self.branching_factor()
+        result['nodes_per_second'] = (self.nodes / self.seconds
+                                      if self.seconds else 0.0)
+        return result
+
+    def __str__(self) -> str:
+        """
+        Return a one-line summary of the statistics.
+
+        >>> print(SearchStats('abminimax', 'p1'))
+        p1 abminimax -> None: 0 nodes (0 terminal), depth 0, branching 0.00, \
+0 make_move, 0/0 cache hits, 0.000s
+        """
+        return ('{} {} -> {}: {} nodes ({} terminal), depth {}, branching '
+                '{:.2f}, {} make_move, {}/{} cache hits, {:.3f}s').format(
+                    self.player, self.strategy, self.move, self.nodes,
+                    self.terminals, self.max_depth, self.branching_factor(),
+                    self.make_moves, self.cache_hits,
+                    self.cache_hits + self.cache_misses, self.seconds)
+
+
+def run_instrumented(current_strategy: Callable, game: Any,
+                     **options: Any) -> tuple:
+    """
+    Return the move current_strategy(game, **options) picks and the
+    SearchStats of its search.
+
+    Searches done in other threads or processes, such as a Ponderer or the
+    workers of parallel_minimax, are not counted in the SearchStats. They
+    do share strategy.TABLE, so its cache hits are only those of this
+    decision while no other search is running. Strategies with a table of
+    their own, such as dfpn_strategy, add its hits to the SearchStats.
+    """
+    stats = SearchStats(getattr(current_strategy, '__name__',
+                                str(current_strategy)),
+                        game.current_state.get_current_player_name())
+    hits = strategy.TABLE.hits
+    misses = strategy.TABLE.misses
+    strategy.SEARCH.stats = stats
+    start = time.perf_counter()
+    try:
+        stats.move = current_strategy(game, **options)
+    finally:
+        stats.seconds = time.perf_counter() - start
+        strategy.SEARCH.stats = None
+    stats.cache_hits += strategy.TABLE.hits - hits
+    stats.cache_misses += strategy.TABLE.misses - misses
+    return stats.move, stats
+
+
+def print_stats(stats: SearchStats) -> None:
+    """
+    A hook for GameInterface.play that prints a summary of every search.
+    """
+    print(stats)
@@ -0,0 +1,235 @@
+"""
+Solve a game offline and store every position's value and best move in a
+sorted binary file, which is looked up through mmap without loading it.
+
+Example, every position of Stonehenge with side length 2, and every
+Subtract Square total up to 1000:
+
+    python opening_book.py h 2 --output stonehenge2.book
+    python opening_book.py s 1000 --output subtract1000.book
+
+The file starts with HEADER and holds one RECORD per position, sorted by
+key, so any number of processes can share one file through the page cache.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import mmap
+import struct
+import time
+from typing import Any, Union
+
+# magic, version, whether keys are canonical, number of records
+HEADER = struct.Struct('<4sBBxxQ')
+MAGIC = b'BOOK'
+VERSION = 1
+
+# key, value for the player to move, index of the best move in
+# get_possible_moves() or NO_MOVE
+RECORD = struct.Struct('<QbxH')
+KEY = struct.Struct('<Q')
+NO_MOVE = 0xFFFF
+
+
+def solve_all(states: list, canonical: bool = False) -> dict:
+    """
+    Return (value, best move index) by key for every position reachable
+    from the states in states. Values are for the player to move.
+
+    Every position is searched without pruning, since all of them are
+    stored. The search keeps its own stack, so long games do not hit the
+    recursion limit. If canonical is True, positions are keyed by
+    get_canonical_key and no best move is stored, since a move of one
+    position is not a move of its mirror images.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> solved = solve_all([SubtractSquareState(True, 5)])
+    >>> solved[SubtractSquareState(True, 5).get_key()]
+    (-1, 0)
+    >>> solved[SubtractSquareState(False, 4).get_key()]
+    (1, 1)
+    """
+    solved = {}
+    for start in states:
+        stack = [(start, iter(start.get_possible_moves()), None, 0)]
+        while stack:
+            state, moves, best, index = stack[-1]
+            move = next(moves, None)
+            if move is not None:
+                child = state.make_move(move)
+                key = get_book_key(child, canonical)
+                if key not in solved:
+                    stack.append((child, iter(child.get_possible_moves()),
+                                  None, 0))
+                    continue
+                stack[-1] = (state, moves, best_of(best, solved[key][0],
+                                                   index), index + 1)
+                continue
+            stack.pop()
+            if best is None:
+                value, move_index = terminal_value(state), NO_MOVE
+            else:
+                value, move_index = best
+            solved[get_book_key(state, canonical)] = (
+                value, NO_MOVE if canonical else move_index)
+            if stack:
+                parent, parent_moves, parent_best, parent_index = stack[-1]
+                stack[-1] = (parent, parent_moves,
+                             best_of(parent_best, value, parent_index),
+                             parent_index + 1)
+    return solved
+
+
+def best_of(best: Union[None, tuple], child_value: int, index: int) -> tuple:
+    """
+    Return the better of best, a (value, move index) pair or None, and the
+    move at index leading to a child worth child_value to its player.
+    Earlier moves win ties.
+    """
+    if best is None or -1 * child_value > best[0]:
+        return -1 * child_value, index
+    return best
+
+
+def terminal_value(state: Any) -> int:
+    """
+    Return the value of the finished game at state for its player to move.
+    """
+    winner = state.winner()
+    if winner is None:
+        return state.DRAW
+    elif winner == state.get_current_player_name():
+        return state.WIN
+    return state.LOSE
+
+
+def get_book_key(state: Any, canonical: bool) -> int:
+    """
+    Return the key state is stored under in a book that is canonical or
+    not.
+    """
+    return state.get_canonical_key() if canonical else state.get_key()
+
+
+def write_book(path: str, solved: dict, canonical: bool = False) -> None:
+    """
+    Write the positions of solved, as returned by solve_all, to the file at
+    path, sorted by key.
+    """
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, canonical, len(solved)))
+        for key in sorted(solved):
+            value, move_index = solved[key]
+            file.write(RECORD.pack(key, value, move_index))
+
+
+class OpeningBook:
+    """
+    A read-only view of a book file, searched in place through mmap.
+
+    Attribute:
+    path: the file of the book
+    canonical: whether positions are keyed by get_canonical_key
+    size: the number of positions in the book
+    """
+    path: str
+    canonical: bool
+    size: int
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the book at path.
+
+        Raise ValueError if path is not a book file.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError('{} is not a book file'.format(path))
+        magic, version, canonical, size = HEADER.unpack_from(self._map, 0)
+        if (magic != MAGIC or version != VERSION
+                or len(self._map) != HEADER.size + size * RECORD.size):
+            raise ValueError('{} is not a book file'.format(path))
+        self.canonical = bool(canonical)
+        self.size = size
+
+    def __len__(self) -> int:
+        """
+        Return the number of positions in self.
+        """
+        return self.size
+
+    def find(self, key: int) -> Union[None, tuple]:
+        """
+        Return the (value, move index) stored for key, or None if key is not
+        in self, by binary search over the sorted records.
+        """
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            found = KEY.unpack_from(self._map, offset)[0]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return RECORD.unpack_from(self._map, offset)[1:]
+        return None
+
+    def value(self, state: Any) -> Union[None, int]:
+        """
+        Return the value of state for its player to move, or None if state
+        is not in self.
+        """
+        entry = self.find(get_book_key(state, self.canonical))
+        return None if entry is None else entry[0]
+
+    def best_move(self, state: Any) -> Any:
+        """
+        Return a best move for state, or None if state is not in self or the
+        game is over.
+
+        Books with canonical keys store no moves, so the move is found by
+        looking up the children of state instead.
+        """
+        entry = self.find(get_book_key(state, self.canonical))
+        if entry is None:
+            return None
+        value, move_index = entry
+        moves = state.get_possible_moves()
+        if move_index != NO_MOVE:
+            return moves[move_index]
+        for move in moves:
+            if self.value(state.make_move(move)) == -1 * value:
+                return move
+        return None
+
+    def close(self) -> None:
+        """
+        Release the memory map of self.
+        """
+        self._map.close()
+
+
+if __name__ == '__main__':
+    from game_interface import playable_games
+    parser = argparse.ArgumentParser(description='Solve a game and write '
+                                                 'its opening book.')
+    parser.add_argument('game', choices=sorted(playable_games))
+    parser.add_argument('size', type=int,
+                        help='the side length or the largest total')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--canonical', action='store_true',
+                        help='store symmetric positions once')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    positions = solve_all([playable_games[args.game](p1_starts, args.size)
+                           .current_state for p1_starts in [True, False]],
+                          args.canonical)
+    write_book(args.output, positions, args.canonical)
+    print('{} positions written to {} in {:.1f}s'.format(
+        len(positions), args.output, time.perf_counter() - start))
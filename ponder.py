@@ -0,0 +1,113 @@
+"""
+Pondering: searching a bot's replies while its opponent thinks.
+
+While a human player types a move, a Ponderer works out the move the bot
+would make after each of the human's possible moves, the likeliest first.
+Once the human has moved, the search in progress is stopped, and the bot's
+move is used if it is ready. Even when it is not, the scores the pondering
+cached in strategy.TABLE are reused by the bot's own search.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import copy
+import threading
+from typing import Any, Callable
+from strategy import SEARCH, SearchTimeout
+
+
+class Ponderer:
+    """
+    A background search of the replies of one bot strategy.
+
+    Only one search runs at a time: finish stops the pondering thread and
+    waits for it before the bot searches again, so strategies never share
+    their caches between threads.
+
+    Attribute:
+    game: the game being played
+    strategy: the strategy of the bot
+    options: keyword options for strategy
+    replies: the move strategy picked, by the key of the state after each
+             opponent move searched so far
+    """
+    game: Any
+    strategy: Callable
+    options: dict
+    replies: dict
+
+    def __init__(self, game: Any, strategy: Callable,
+                 options: dict = None) -> None:
+        """
+        Initialize a ponderer for strategy, called with options, in game.
+        """
+        self.game = game
+        self.strategy = strategy
+        self.options = options or {}
+        self.replies = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, state: Any) -> None:
+        """
+        Start searching the replies to every move the opponent has at state.
+        """
+        self.replies = {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.ponder, args=(state,),
+                                        daemon=True)
+        self._thread.start()
+
+    def ponder(self, state: Any) -> None:
+        """
+        Store the reply of strategy to each move at state in replies, until
+        all are searched or finish is called.
+
+        The moves are searched in order of the rough_outcome they leave for
+        the bot, lowest first, as those are the moves the opponent is most
+        likely to play. The searches run with SEARCH.stop set to the stop
+        event of self, so finish stops the one in progress at once.
+
+        >>> from subtract_square_game import SubtractSquareGame
+        >>> from strategy import solved_strategy
+        >>> ponderer = Ponderer(SubtractSquareGame(True, 10),
+        ...                     solved_strategy)
+        >>> ponderer.ponder(ponderer.game.current_state)
+        >>> sorted(ponderer.replies.values())
+        [1, 1, 4]
+        """
+        game = copy.copy(self.game)
+        children = [state.make_move(move)
+                    for move in state.get_possible_moves()]
+        children.sort(key=lambda child: child.rough_outcome())
+        SEARCH.stop = self._stop
+        try:
+            for child in children:
+                if self._stop.is_set():
+                    return
+                if game.is_over(child):
+                    continue
+                game.current_state = child
+                reply = self.strategy(game, **self.options)
+                # a stopped timed search returns its best move so far
+                if self._stop.is_set():
+                    return
+                self.replies[child.get_key()] = reply
+        except SearchTimeout:
+            return
+        finally:
+            SEARCH.stop = None
+
+    def finish(self, state: Any) -> Any:
+        """
+        Stop pondering and return the reply found for state, the position
+        after the opponent's move, or None if it was not searched in time.
+
+        The search in progress is stopped rather than finished, since it is
+        usually for a move the opponent did not play. The scores it already
+        cached are kept for the bot's own search.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.replies.get(state.get_key())
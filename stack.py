@@ -15,6 +15,70 @@ class Tree:
         self.state = state
         self.score = None
         self.children = []
+        self.depth = 0
+
+
+class Frame:
+    """
+    A position on the current path of a depth-first minimax search. Only the
+    moves not yet searched are kept, never the children themselves.
+    """
+
+    def __init__(self, state, parent=None, move=None) -> None:
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.moves = iter(state.get_possible_moves())
+        self.score = None
+        self.best_move = None
+        self.ply = 0 if parent is None else parent.ply + 1
+
+
+class DepthSearch:
+    """
+    One pass of timed_minimax over game, searching depth moves ahead until
+    the time.perf_counter() time deadline. cut holds the positions where
+    the depth limit stopped the search.
+    """
+
+    def __init__(self, game, depth, deadline) -> None:
+        self.game = game
+        self.depth = depth
+        self.deadline = deadline
+        self.cut = []
+
+
+class CycleSearch:
+    """
+    One decision of cycle_minimax over game. path holds the ply of each
+    position on the current line of play, and scores the scores of this
+    decision that do not depend on the line of play, both by key. budget
+    positions may still be expanded, none more than max_depth moves below
+    the current state.
+    """
+
+    def __init__(self, game, budget, max_depth) -> None:
+        self.game = game
+        self.path = {}
+        self.scores = {}
+        self.budget = budget
+        self.max_depth = max_depth
+
+
+class MonteCarloNode:
+    """
+    A node of a Monte Carlo search tree. wins is the total reward of the
+    playouts through this node, for the player who moved into it.
+    """
+
+    def __init__(self, state, parent=None, move=None) -> None:
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.untried = list(state.get_possible_moves())
+        self.visits = 0
+        self.wins = 0.0
 
 
 class Stack:
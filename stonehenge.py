@@ -1,9 +1,15 @@
 """
 The Stonehenge game. State and Game.
 """
+import itertools
 from typing import Any
 from game import Game
 from game_state import GameState
+from transposition import TranspositionTable
+from zobrist import TURN_KEY, random_keys
+
+# rough_outcome of every state it was asked for, by Zobrist hash.
+ROUGH_OUTCOMES = TranspositionTable(100000)
 
 
 class StonehengeGame(Game):
@@ -15,25 +21,20 @@ class StonehengeGame(Game):
     """
     is_p1_turn: bool
 
-    def __init__(self, is_p1_turn: bool) -> None:
+    def __init__(self, is_p1_turn: bool, length: int = None) -> None:
         """
         Initialize this game state and set the current player based on
-        is_p1_turn.
+        is_p1_turn. The side length of the board is asked for if length is
+        not given.
 
-        No examples available, since this method rely on user input.
+        >>> game = StonehengeGame(True, 2)
+        >>> game.current_state.get_possible_moves()
+        ['A', 'B', 'C', 'D', 'E', 'F', 'G']
         """
-        self.current_state = StonehengeState()
-        self.current_state.length = \
-            int(input('Enter the side length of the board: '))
+        if length is None:
+            length = int(input('Enter the side length of the board: '))
         self.is_p1_turn = is_p1_turn
-        if self.is_p1_turn is True:
-            self.current_state.player = 'p1'
-        else:
-            self.current_state.player = 'p2'
-        self.current_state.possible_move = \
-            self.current_state.get_initial_moves()
-        self.current_state.stonehenge = stone_generator(self.
-                                                        current_state.length)
+        self.current_state = StonehengeState(is_p1_turn, length)
 
     def get_instructions(self) -> str:
         """
@@ -50,7 +51,7 @@ class StonehengeGame(Game):
         """
         Return whether or not this game is over at state.
         """
-        return state.over is True
+        return state.is_terminal()
 
     def is_winner(self, player: str) -> bool:
         """
@@ -58,9 +59,7 @@ class StonehengeGame(Game):
 
         Precondition: player is 'p1' or 'p2'.
         """
-        if self.current_state.over is True:
-            return self.current_state.player != player
-        return False
+        return self.current_state.winner() == player
 
     def str_to_move(self, string: str) -> str:
         """
@@ -78,161 +77,282 @@ class StonehengeState(GameState):
     """
     A game to be played with two players
 
+    Cells are numbered in reading order, so cell i is labelled
+    cell_label(i). Ley-lines are numbered as in get_ley_line_index.
+
     Attribute:
     over: whether the game is over or not
-    player: the name of the current player
     length : the length of stonehenge
-    possible_move: possible moves
-    stonehenge: stonehenge
+    p1_cells: bitmask of the cells p1 took
+    p2_cells: bitmask of the cells p2 took
+    ley_lines: owner of each ley-line, 0 if unclaimed, otherwise 1 or 2
+    line_counts: cells p1 and p2 hold in each ley-line, at 2 * line and
+                 2 * line + 1
+    history: the undo stack of apply_move, or None if it was never used
+    zobrist: the Zobrist hash of self, kept up to date by every move
     p1_claimed: number of ley-lines p1 claimed
     p2_claimed: number of ley-lines p2 claimed
     """
+    __slots__ = ('over', 'length', 'p1_cells', 'p2_cells', 'ley_lines',
+                 'line_counts', 'p1_claimed', 'p2_claimed', 'history',
+                 'zobrist')
     over: bool
-    player: str
     length: int
-    possible_move: list
-    stonehenge: list
+    p1_cells: int
+    p2_cells: int
+    ley_lines: bytes
+    line_counts: bytes
     p1_claimed: int
     p2_claimed: int
-    letters = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L',
-               'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y']
+    history: list
+    zobrist: int
 
-    def __init__(self):
+    def __init__(self, is_p1_turn: bool = True, length: int = 1) -> None:
         """
-        Initialize this game state and set the current player based on
-        is_p1_turn.
+        Initialize an empty board of side length length and set the current
+        player based on is_p1_turn.
 
         >>> new = StonehengeState()
         >>> new.over
         False
+        >>> new.player
+        'p1'
         """
+        super().__init__(is_p1_turn)
         self.over = False
-        self.player = None
-        self.possible_move = []
-        self.length = None
-        self.stonehenge = None
+        self.length = length
+        self.p1_cells = 0
+        self.p2_cells = 0
+        self.ley_lines = bytes(3 * (length + 1))
+        self.line_counts = bytes(6 * (length + 1))
         # ley-lines each player claimed
         self.p1_claimed = 0
         self.p2_claimed = 0
+        self.history = None
+        self.zobrist = get_ley_line_index(length).board_key
+        if is_p1_turn:
+            self.zobrist ^= TURN_KEY
 
-    def __str__(self) -> str:
+    @property
+    def player(self) -> str:
         """
-        Return a string representation of the current state of the game.
+        Return the name of the current player.
         """
-        copy = [x[:] for x in self.stonehenge]
-        for items in copy:
-            items.append('\n')
-        whole_list = sum(copy, [])
-        strings = ''
-        for items in whole_list:
-            strings += items
-        return strings
+        return self.get_current_player_name()
 
-    def get_current_player_name(self) -> str:
+    @property
+    def stonehenge(self) -> list:
         """
-        Return 'p1' if the current player is Player 1, and 'p2' if the current
-        player is Player 2.
+        Return the board drawing of self as a list of rows of items, each
+        a character or a cell label.
 
-        >>> new = StonehengeState()
-        >>> new.player = 'p1'
-        >>> new.player
-        'p1'
+        >>> new = StonehengeState(False, 1)
+        >>> new = new.make_move('A')
+        >>> ''.join(new.stonehenge[2])
+        '2 - 2 - B'
+        """
+        template = get_board_template(self.length)
+        board = [list(row) for row in template.rows]
+        for (row, column), item in zip(template.cells + template.markers,
+                                       self.drawing_items()):
+            board[row][column] = item
+        return board
+
+    def drawing_items(self) -> list:
+        """
+        Return what is drawn at each cell of self, then at each ley-line
+        marker, in the order of BoardTemplate.cells and markers.
+
+        >>> StonehengeState(False, 1).make_move('A').drawing_items()
+        ['2', 'B', 'C', '2', '@', '2', '@', '2', '@']
         """
-        return self.player
+        index = get_ley_line_index(self.length)
+        items = [('1' if self.p1_cells >> cell & 1 else
+                  '2' if self.p2_cells >> cell & 1 else label)
+                 for cell, label in enumerate(index.labels)]
+        items.extend(str(owner) if owner else '@'
+                     for owner in self.ley_lines)
+        return items
+
+    def __str__(self) -> str:
+        """
+        Return a string representation of the current state of the game.
+
+        The drawing is filled into the cached template of its side length
+        in one pass, and nothing about self is changed.
+
+        >>> print(StonehengeState(True, 1))
+              @   @
+             /   /
+        @ - A - B
+             \\ / \\
+          @ - C   @
+               \\
+                @
+        """
+        return get_board_template(self.length).text.format(
+            *self.drawing_items())
 
     def get_possible_moves(self) -> list:
         """
         Return all possible moves that can be applied to this state.
 
-        >>> new = StonehengeState()
+        >>> new = StonehengeState(True, 1)
+        >>> new.get_possible_moves()
+        ['A', 'B', 'C']
         >>> new.over = True
         >>> new.get_possible_moves()
         []
         """
         if self.over:
             return []
-        return self.possible_move
+        taken = self.p1_cells | self.p2_cells
+        return [move for i, move in enumerate(self.get_initial_moves())
+                if not taken >> i & 1]
 
-    def get_initial_moves(self):
+    def get_initial_moves(self) -> list:
         """
         Return a list of initial moves based on length given.
+
+        >>> StonehengeState(True, 6).get_initial_moves()[-8:]
+        ['Z', 'AA', 'AB', 'AC', 'AD', 'AE', 'AF', 'AG']
         """
-        n = None
-        if self.length == 1:
-            n = 3
-        elif self.length == 2:
-            n = 7
-        elif self.length == 3:
-            n = 12
-        elif self.length == 4:
-            n = 18
-        elif self.length == 5:
-            n = 25
-        return [StonehengeState.letters[i] for i in range(n)]
-
-    # back up plan
+        return list(get_ley_line_index(self.length).labels)
+
     def make_a_copy(self) -> 'StonehengeState':
         """
         Return a copy of self.
 
-        >>> old = StonehengeState()
-        >>> old.stonehenge = []
+        The copy shares the immutable ley_lines and line_counts of self, so
+        it takes constant space for a given side length.
+
+        >>> old = StonehengeState(True, 2)
         >>> new = old.make_a_copy()
-        >>> new.stonehenge
-        []
+        >>> new.length
+        2
         """
-        new = StonehengeState()
+        new = StonehengeState.__new__(StonehengeState)
+        new.p1_turn = self.p1_turn
         new.over = self.over
-        new.player = self.player
-        new.possible_move = self.possible_move[:]
         new.length = self.length
-        new.stonehenge = [x[:] for x in self.stonehenge]
+        new.p1_cells = self.p1_cells
+        new.p2_cells = self.p2_cells
+        new.ley_lines = self.ley_lines
+        new.line_counts = self.line_counts
         # ley-lines each player claimed
         new.p1_claimed = self.p1_claimed
         new.p2_claimed = self.p2_claimed
-        #new.winner = self.winner
+        new.history = None
+        new.zobrist = self.zobrist
         return new
 
+    def __getstate__(self) -> tuple:
+        """
+        Return the fields of self that pickle needs, leaving out the undo
+        stack.
+        """
+        return (self.p1_turn, self.over, self.length, self.p1_cells,
+                self.p2_cells, self.ley_lines, self.line_counts,
+                self.p1_claimed, self.p2_claimed, self.zobrist)
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Restore self from the fields given by __getstate__.
+
+        >>> import pickle
+        >>> new = StonehengeState(True, 2).make_move('A')
+        >>> pickle.loads(pickle.dumps(new)) == new
+        True
+        """
+        (self.p1_turn, self.over, self.length, self.p1_cells, self.p2_cells,
+         self.ley_lines, self.line_counts, self.p1_claimed, self.p2_claimed,
+         self.zobrist) = state
+        self.history = None
+
     def make_move(self, move: str) -> 'StonehengeState':
         """
         Return the GameState that results from applying move to this GameState.
+
+        >>> new = StonehengeState(True, 1).make_move('A')
+        >>> (new.player, new.p1_cells, new.p1_claimed)
+        ('p2', 1, 3)
         """
         new_one = self.make_a_copy()
-        index_of_row = self.get_row_num(move)
-        index_of_column = self.location_in_row(index_of_row, move)
-        if self.player == 'p1':
-            new_one.stonehenge[index_of_row][index_of_column] = '1'
-        else:
-            new_one.stonehenge[index_of_row][index_of_column] = '2'
-        new_one.possible_move.remove(move)
-
-        # not claimed up means the marker is '@'
-        if not self.is_claimed_up(index_of_row, index_of_column):
-            # modify new_one without changing self
-            new_one.go_claim_up(index_of_row, index_of_column)
-
-        if not self.is_claimed_down(index_of_row, index_of_column):
-            new_one.go_claim_down(index_of_row, index_of_column)
+        new_one.place(move)
+        return new_one
 
-        if not self.is_claimed_left(index_of_row, index_of_column):
-            new_one.go_claim_left(index_of_row, index_of_column)
+    def apply_move(self, move: str) -> None:
+        """
+        Apply move to self in place, so that undo_move can take it back.
 
-        if self.player == 'p1':
-            new_one.player = 'p2'
-        elif self.player == 'p2':
-            new_one.player = 'p1'
+        >>> new = StonehengeState(True, 1)
+        >>> new.apply_move('A')
+        >>> (new.player, new.over)
+        ('p2', True)
+        >>> new.undo_move()
+        >>> (new.player, new.over, new.get_possible_moves())
+        ('p1', False, ['A', 'B', 'C'])
+        """
+        if self.history is None:
+            self.history = []
+        self.history.append((self.p1_cells, self.p2_cells, self.ley_lines,
+                             self.line_counts, self.p1_claimed,
+                             self.p2_claimed, self.over, self.zobrist))
+        self.place(move)
 
-        # modify new_one.over if needed
-        new_one.check_over()
+    def undo_move(self) -> None:
+        """
+        Take back the last move applied to self by apply_move.
+        """
+        (self.p1_cells, self.p2_cells, self.ley_lines, self.line_counts,
+         self.p1_claimed, self.p2_claimed, self.over,
+         self.zobrist) = self.history.pop()
+        self.p1_turn = not self.p1_turn
 
-        return new_one
+    def place(self, move: str) -> None:
+        """
+        Modify self by letting the current player take the cell move.
+        """
+        index = get_ley_line_index(self.length)
+        cell = index.cells_by_label[move]
+        if self.p1_turn:
+            self.p1_cells |= 1 << cell
+            player = 0
+        else:
+            self.p2_cells |= 1 << cell
+            player = 1
+        self.zobrist ^= index.cell_keys[2 * cell + player] ^ TURN_KEY
+
+        # count the cell in its three ley-lines, and claim those the current
+        # player now holds at least half of
+        counts = bytearray(self.line_counts)
+        lines = None
+        for line in index.cell_lines[cell]:
+            counts[2 * line + player] += 1
+            if (not self.ley_lines[line]
+                    and counts[2 * line + player] >= index.line_needs[line]):
+                if lines is None:
+                    lines = bytearray(self.ley_lines)
+                lines[line] = player + 1
+                self.zobrist ^= index.line_keys[2 * line + player]
+                if self.p1_turn:
+                    self.p1_claimed += 1
+                else:
+                    self.p2_claimed += 1
+        self.line_counts = bytes(counts)
+        if lines is not None:
+            self.ley_lines = bytes(lines)
+
+        self.p1_turn = not self.p1_turn
+
+        # modify self.over if needed
+        self.check_over()
 
     def check_over(self) -> None:
         """
         Check and modify game state if the game is over.
 
-        >>> new = StonehengeState()
-        >>> new.length = 1
+        >>> new = StonehengeState(True, 1)
         >>> new.p1_claimed = 3
         >>> new.p2_claimed = 1
         >>> new.check_over()
@@ -244,229 +364,14 @@ class StonehengeState(GameState):
             self.over = True
         return None
 
-    def go_claim_up(self, index_of_row: int, index_of_column: int) -> None:
-        """
-        Modify self, if this ley-line can be claimed up. Otherwise, return None.
-        """
-        row = index_of_row
-        column = index_of_column
-        num_of_p1 = 0
-        num_of_p2 = 0
-        i = 0
-        # go right up
-        while (0 <= row
-               and column < len(self.stonehenge[row])
-               and self.stonehenge[row][column] != '@'):
-            if self.stonehenge[row][column] == '1':
-                num_of_p1 += 1
-            elif self.stonehenge[row][column] == '2':
-                num_of_p2 += 1
-            row -= 2
-            column += 2
-            i += 1
-
-        row1 = index_of_row + 2
-        column1 = index_of_column - 2
-        ii = 0
-        # go left down
-        while (row1 < len(self.stonehenge) - 2
-               and column1 > 3
-               and (self.stonehenge[row1][column1].isalpha() or
-                    self.stonehenge[row1][column1] in ['1', '2'])):
-            if self.stonehenge[row1][column1] == '1':
-                num_of_p1 += 1
-            elif self.stonehenge[row1][column1] == '2':
-                num_of_p2 += 1
-            row1 += 2
-            column1 -= 2
-            ii += 1
-
-        # make change to self, if possible
-        if num_of_p1 >= (i+ii)/2:
-            if self.player == 'p1':
-                self.stonehenge[row][column] = '1'
-                self.p1_claimed += 1
-        elif num_of_p2 >= (i+ii)/2:
-            if self.player == 'p2':
-                self.stonehenge[row][column] = '2'
-                self.p2_claimed += 1
-
-    def go_claim_down(self, index_of_row: int, index_of_column: int) -> None:
-        """
-        Modify self, if this ley-line can be claimed down.
-        Otherwise, return None.
-        """
-        row = index_of_row
-        column = index_of_column
-        num_of_p1 = 0
-        num_of_p2 = 0
-        i = 0
-        # go right down
-        while (row < len(self.stonehenge)
-               and column < len(self.stonehenge[row])
-               and self.stonehenge[row][column] != '@'):
-            if self.stonehenge[row][column] == '1':
-                num_of_p1 += 1
-            elif self.stonehenge[row][column] == '2':
-                num_of_p2 += 1
-            row += 2
-            column += 2
-            i += 1
-
-        row1 = index_of_row - 1
-        column1 = index_of_column - 1
-        ii = 0
-        while (1 < row1
-               and column1 > 3
-               and self.stonehenge[row1][column1] != ' '):
-            if self.stonehenge[row1][column1] == '1':
-                num_of_p1 += 1
-            elif self.stonehenge[row1][column1] == '2':
-                num_of_p2 += 1
-            elif self.stonehenge[row1][column1] == '\\':
-                ii += 1
-            row1 -= 1
-            column1 -= 1
-
-        # make change to self, if possible
-        if num_of_p1 >= (i + ii) / 2:
-            if self.player == 'p1':
-                self.stonehenge[row][column] = '1'
-                self.p1_claimed += 1
-        elif num_of_p2 >= (i + ii) / 2:
-            if self.player == 'p2':
-                self.stonehenge[row][column] = '2'
-                self.p2_claimed += 1
-
-    def go_claim_left(self, index_of_row: int, index_of_column: int) -> None:
-        """
-        Modify self, if this ley-line can be claimed down.
-        Otherwise, return None.
-        """
-        row = index_of_row
-        column = index_of_column
-        num_of_p1 = 0
-        num_of_p2 = 0
-        i = 0
-        # go left
-        while (column >= 0
-               and self.stonehenge[row][column] != '@'):
-            if self.stonehenge[row][column] == '1':
-                num_of_p1 += 1
-            elif self.stonehenge[row][column] == '2':
-                num_of_p2 += 1
-            column -= 4
-            i += 1
-
-        row1 = index_of_row
-        column1 = index_of_column + 4
-        ii = 0
-        # go right
-        if len(self.stonehenge[row1]) == 4 * self.length + 5:
-            while (column1 < len(self.stonehenge[row1])
-                   and (self.stonehenge[row1][column1].isalpha()
-                        or self.stonehenge[row1][column1] in ['1', '2'])):
-                if self.stonehenge[row1][column1] == '1':
-                    num_of_p1 += 1
-                elif self.stonehenge[row1][column1] == '2':
-                    num_of_p2 += 1
-                column1 += 4
-                ii += 1
-        else:
-            while (column1 < (len(self.stonehenge[row1]) - 4)
-                   and (self.stonehenge[row1][column1].isalpha() or
-                        self.stonehenge[row1][column1] in ['1', '2'])):
-                if self.stonehenge[row1][column1] == '1':
-                    num_of_p1 += 1
-                elif self.stonehenge[row1][column1] == '2':
-                    num_of_p2 += 1
-                column1 += 4
-                ii += 1
-
-        # make change to self, if possible
-        if num_of_p1 >= (i + ii) / 2:
-            if self.player == 'p1':
-                self.stonehenge[row][column] = '1'
-                self.p1_claimed += 1
-        elif num_of_p2 >= (i + ii) / 2:
-            if self.player == 'p2':
-                self.stonehenge[row][column] = '2'
-                self.p2_claimed += 1
-
-    def is_claimed_down(self, index_of_row: int, index_of_column: int) -> bool:
-        """
-        Return if right down ley-line is claimed or not.
-        """
-        row = index_of_row
-        column = index_of_column
-        while row < len(self.stonehenge) and column < len(self.stonehenge[row]):
-            if self.stonehenge[row][column] == '@':
-                return False
-            row += 2
-            column += 2
-        return True
-
-    def is_claimed_left(self, index_of_row: int, index_of_column: int) -> bool:
-        """
-        Return if right up ley-line is claimed or not.
-        """
-        row = index_of_row
-        column = index_of_column
-        while column >= 0:
-            if self.stonehenge[row][column] == '@':
-                return False
-            column -= 4
-        return True
-
-    def is_claimed_up(self, index_of_row: int, index_of_column: int) -> bool:
-        """
-        Return if right up ley-line is claimed or not.
-        """
-        row = index_of_row
-        column = index_of_column
-        while row >= 0 and column < len(self.stonehenge[row]):
-            if self.stonehenge[row][column] == '@':
-                return False
-            row -= 2
-            column += 2
-        return True
-
-    def location_in_row(self, index_of_row: int, move: str) -> int:
-        """
-        Return the index of the move in a list.
-        """
-        ax = self.stonehenge[index_of_row]
-        return ax.index(move)
-
-    def get_row_num(self, move) -> int:
-        """
-        Return which row of cells is the move located.
-
-        >>> new = StonehengeState()
-        >>> new.get_row_num('A')
-        2
-        """
-        if move in['A', 'B']:
-            return 2
-            # this is the index of the list, for row, it's the 3rd row
-        elif move in ['C', 'D', 'E']:
-            return 4
-        elif move in ['F', 'G', 'H', 'I']:
-            return 6
-        elif move in ['J', 'K', 'L', 'M', 'N']:
-            return 8
-        elif move in ['O', 'P', 'Q', 'R', 'S', 'T']:
-            return 10
-        elif move in ['U', 'V', 'W', 'X', 'Y']:
-            return 12
-        return -1
-
     def is_valid_move(self, move: Any) -> bool:
         """
         Return whether move is a valid move for this GameState.
 
-        >>> new = StonehengeState()
-        >>> "A" in new.possible_move
+        >>> new = StonehengeState(True, 1)
+        >>> "A" in new.get_possible_moves()
+        True
+        >>> new.is_valid_move("D")
         False
         """
         return move in self.get_possible_moves()
@@ -476,104 +381,575 @@ class StonehengeState(GameState):
         Return a representation of this state (which can be used for
         equality testing).
         """
-        copy = self.stonehenge[:]
-        for items in copy:
-            items.append('\n')
-        whole_list = sum(copy, [])
-        strings = ''
-        for items in whole_list:
-            strings += items
-        henge = strings
-
         return 'Player turn: {}\nOver or not: {}\nPossible moves: {}\n'\
                'Ley-line p1 claimed: {}\nLey-line p2 claimed: {}\n'\
                'Size length:\n'.format(self.player, self.over,
-                                       self.possible_move, self.p1_claimed,
-                                       self.p2_claimed) + henge
+                                       self.get_possible_moves(),
+                                       self.p1_claimed,
+                                       self.p2_claimed) + str(self)
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether self and other are the same position.
+
+        >>> new = StonehengeState(True, 2)
+        >>> first = new.make_move('A').make_move('F').make_move('E')
+        >>> second = new.make_move('E').make_move('G').make_move('A')
+        >>> first.make_move('G') == second.make_move('F')
+        True
+        >>> StonehengeState(True, 2) == StonehengeState(False, 2)
+        False
+        """
+        return (type(self) == type(other)
+                and self.zobrist == other.zobrist
+                and self.p1_turn == other.p1_turn
+                and self.length == other.length
+                and self.p1_cells == other.p1_cells
+                and self.p2_cells == other.p2_cells
+                and self.ley_lines == other.ley_lines)
+
+    def __hash__(self) -> int:
+        """
+        Return the Zobrist hash of self.
+        """
+        return self.zobrist
+
+    def get_key(self) -> int:
+        """
+        Return the 64-bit Zobrist hash of self as its key.
+
+        >>> new = StonehengeState(True, 2)
+        >>> new.make_move('A').make_move('F').make_move('E').get_key() == \\
+        ...     new.make_move('E').make_move('F').make_move('A').get_key()
+        True
+        """
+        return self.zobrist
+
+    def transform(self, symmetry: tuple) -> 'StonehengeState':
+        """
+        Return the position symmetry maps self to, where symmetry is one of
+        the (cell map, ley-line map) pairs of LeyLineIndex.symmetries.
+
+        >>> index = get_ley_line_index(1)
+        >>> new = StonehengeState(True, 1).make_move('A')
+        >>> [new.transform(symmetry).p1_cells
+        ...  for symmetry in index.symmetries]
+        [1, 1, 4, 2, 4, 2]
+        """
+        index = get_ley_line_index(self.length)
+        cells, lines = symmetry
+        new = StonehengeState.__new__(StonehengeState)
+        new.p1_turn = self.p1_turn
+        new.over = self.over
+        new.length = self.length
+        new.p1_claimed = self.p1_claimed
+        new.p2_claimed = self.p2_claimed
+        new.history = None
+        new.p1_cells = 0
+        new.p2_cells = 0
+        zobrist = index.board_key ^ (TURN_KEY if self.p1_turn else 0)
+        for cell, image in enumerate(cells):
+            if self.p1_cells >> cell & 1:
+                new.p1_cells |= 1 << image
+                zobrist ^= index.cell_keys[2 * image]
+            elif self.p2_cells >> cell & 1:
+                new.p2_cells |= 1 << image
+                zobrist ^= index.cell_keys[2 * image + 1]
+        owners = bytearray(len(lines))
+        counts = bytearray(len(self.line_counts))
+        for line, image in enumerate(lines):
+            owners[image] = self.ley_lines[line]
+            counts[2 * image] = self.line_counts[2 * line]
+            counts[2 * image + 1] = self.line_counts[2 * line + 1]
+            if self.ley_lines[line]:
+                zobrist ^= index.line_keys[2 * image
+                                           + self.ley_lines[line] - 1]
+        new.ley_lines = bytes(owners)
+        new.line_counts = bytes(counts)
+        new.zobrist = zobrist
+        return new
+
+    def canonical(self) -> 'StonehengeState':
+        """
+        Return the position among self and its mirror images and rotations
+        with the smallest Zobrist hash. Symmetric positions have the same
+        canonical position and the same value.
+
+        >>> new = StonehengeState(True, 1)
+        >>> new.make_move('B').canonical() == new.make_move('C').canonical()
+        True
+        """
+        index = get_ley_line_index(self.length)
+        hashes = self.symmetric_hashes()
+        return self.transform(index.symmetries[hashes.index(min(hashes))])
+
+    def symmetric_hashes(self) -> list:
+        """
+        Return the Zobrist hash of the image of self under each symmetry in
+        LeyLineIndex.symmetries, without building the images.
+
+        >>> new = StonehengeState(True, 2).make_move('C')
+        >>> new.symmetric_hashes()[0] == new.zobrist
+        True
+        """
+        index = get_ley_line_index(self.length)
+        base = index.board_key ^ (TURN_KEY if self.p1_turn else 0)
+        claims = [2 * line + owner - 1
+                  for line, owner in enumerate(self.ley_lines) if owner]
+        p1_bytes = [self.p1_cells >> shift & 255
+                    for shift in range(0, len(index.cell_lines), 8)]
+        p2_bytes = [self.p2_cells >> shift & 255
+                    for shift in range(0, len(index.cell_lines), 8)]
+        hashes = []
+        for p1_tables, p2_tables, line_keys in index.symmetry_keys:
+            zobrist = base
+            for table, byte in zip(p1_tables, p1_bytes):
+                zobrist ^= table[byte]
+            for table, byte in zip(p2_tables, p2_bytes):
+                zobrist ^= table[byte]
+            for claim in claims:
+                zobrist ^= line_keys[claim]
+            hashes.append(zobrist)
+        return hashes
+
+    def get_canonical_key(self) -> int:
+        """
+        Return the Zobrist hash of the canonical position of self.
+
+        >>> new = StonehengeState(True, 3)
+        >>> new.make_move('A').get_canonical_key() == \\
+        ...     new.make_move('L').get_canonical_key()
+        True
+        """
+        return min(self.symmetric_hashes())
 
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
         player can guarantee from state self.
 
-        >>> new = StonehengeState()
+        Results are cached in ROUGH_OUTCOMES by Zobrist hash.
+
+        >>> new = StonehengeState(True, 1)
         >>> new.over = True
         >>> new.rough_outcome()
         -1
+        >>> new = StonehengeState(True, 2).make_move('A').make_move('C')
+        >>> new.rough_outcome()
+        1
         """
         if self.over:
             return -1
-        i = []
-        ii = []
-        iii = []
-        for x in self.get_possible_moves():
-            a = self.make_move(x)
-            if a.over:
-                i.append(x)
-            else:
-                self.helper_rough(a, ii, iii, x)
-
-        if i != []:
-            return 1
-        elif iii != []:
-            return 0
-        return -1
-
-    def helper_rough(self, a, ii, iii, x):
-        """
-        Modify for rought_outcome. A helper.
-        """
-        ss = []
-        for xx in a.get_possible_moves():
-            b = a.make_move(xx)
-            if b.over:
-                ss.append(xx)
-        if len(ss) == len(a.get_possible_moves()):
-            ii.append(x)
+        score = ROUGH_OUTCOMES.get(self.zobrist)
+        if score is not None:
+            return score
+        if self.has_winning_move():
+            score = 1
         else:
-            iii.append(x)
+            # a draw if some move leaves the opponent a move that does not
+            # end the game
+            score = -1
+            for move in self.get_possible_moves():
+                child = self.make_move(move)
+                if (len(child.winning_moves())
+                        < len(child.get_possible_moves())):
+                    score = 0
+                    break
+        ROUGH_OUTCOMES.put(self.zobrist, score)
+        return score
+
+    def is_terminal(self) -> bool:
+        """
+        Return whether the game is over at this state.
+
+        >>> StonehengeState(True, 1).make_move('A').is_terminal()
+        True
+        """
+        return self.over
+
+    def winner(self) -> Any:
+        """
+        Return the name of the player who has won at this state, or None if
+        nobody has won. Only the player who just moved can have won.
+
+        >>> StonehengeState(True, 1).make_move('A').winner()
+        'p1'
+        >>> StonehengeState(True, 1).winner() is None
+        True
+        """
+        if not self.over:
+            return None
+        return 'p2' if self.p1_turn else 'p1'
+
+    def winning_moves(self) -> list:
+        """
+        Return the possible moves that win the game for the current player
+        at once.
+
+        Reads the ley-line counts of self, without making any move.
+
+        >>> StonehengeState(True, 2).winning_moves()
+        []
+        >>> new = StonehengeState(True, 2).make_move('A').make_move('C')
+        >>> new.winning_moves()
+        ['G']
+        """
+        if self.over:
+            return []
+        index = get_ley_line_index(self.length)
+        taken = self.p1_cells | self.p2_cells
+        return [index.labels[cell] for cell in range(len(index.cell_lines))
+                if not taken >> cell & 1 and self.wins_with(index, cell)]
+
+    def has_winning_move(self) -> bool:
+        """
+        Return whether the current player can win the game with one move.
+
+        >>> StonehengeState(True, 1).has_winning_move()
+        True
+        """
+        if self.over:
+            return False
+        index = get_ley_line_index(self.length)
+        taken = self.p1_cells | self.p2_cells
+        return any(not taken >> cell & 1 and self.wins_with(index, cell)
+                   for cell in range(len(index.cell_lines)))
+
+    def wins_with(self, index: 'LeyLineIndex', cell: int) -> bool:
+        """
+        Return whether taking cell claims enough ley-lines for the current
+        player to win, where index is the LeyLineIndex of self.
+        """
+        player = 0 if self.p1_turn else 1
+        claimed = self.p1_claimed if self.p1_turn else self.p2_claimed
+        for line in index.cell_lines[cell]:
+            if (not self.ley_lines[line]
+                    and self.line_counts[2 * line + player] + 1
+                    >= index.line_needs[line]):
+                claimed += 1
+        return 2 * claimed >= len(index.line_cells)
 
 
 # The following code is used to generate stonhenge strings for __str__ method in
 # StonehengeState class.
 
 
-LETTERS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L',
-           'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y']
+# Ley-lines are numbered rows first (top to bottom), then the lines
+# running up and right (left to right), then the lines running down and right
+# (left to right). LEY_LINE_INDEXES caches one LeyLineIndex per side length.
+
+
+class LeyLineIndex:
+    """
+    Which cells lie on which ley-lines, for a board of one side length.
+
+    Attribute:
+    length: the side length of the board
+    cell_lines: the three ley-lines through each cell
+    line_cells: the cells of each ley-line
+    line_needs: the number of cells a player needs to claim each ley-line
+    labels: the label of each cell
+    cells_by_label: the cell with each label
+    cell_keys: Zobrist keys for p1 and p2 taking each cell, at 2 * cell and
+               2 * cell + 1
+    line_keys: Zobrist keys for p1 and p2 claiming each ley-line, at
+               2 * line and 2 * line + 1
+    board_key: the Zobrist key of an empty board of this side length
+    symmetries: the rotations and reflections of the board, as pairs of
+                the cell and the ley-line each cell and ley-line maps to,
+                starting with the identity
+    symmetry_keys: for each symmetry, the Zobrist keys of the images of
+                   every byte of p1_cells and of p2_cells, and the keys of
+                   the images of each ley-line claim
+    """
+    length: int
+    cell_lines: list
+    line_cells: list
+    line_needs: list
+    labels: list
+    cells_by_label: dict
+    cell_keys: list
+    line_keys: list
+    board_key: int
+    symmetries: list
+    symmetry_keys: list
+
+    def __init__(self, length: int) -> None:
+        """
+        Initialize the index of a board of side length length.
+
+        >>> index = LeyLineIndex(1)
+        >>> index.cell_lines
+        [(0, 2, 4), (0, 3, 5), (1, 3, 4)]
+        >>> index.line_cells
+        [(0, 1), (2,), (0,), (1, 2), (0, 2), (1,)]
+        >>> index.line_needs
+        [1, 1, 1, 1, 1, 1]
+        """
+        self.length = length
+        self.cell_lines = []
+        for row in range(length + 1):
+            for column in range(row + 2 if row < length else length):
+                if row < length:
+                    up = column
+                    down = column - row + length - 1
+                else:
+                    up = column + 1
+                    down = column
+                self.cell_lines.append((row, length + 1 + up,
+                                        2 * length + 2 + down))
+        self.line_cells = [tuple(cell for cell, lines
+                                 in enumerate(self.cell_lines)
+                                 if line in lines)
+                           for line in range(3 * (length + 1))]
+        self.line_needs = [(len(cells) + 1) // 2 for cells in self.line_cells]
+        self.labels = [cell_label(cell)
+                       for cell in range(len(self.cell_lines))]
+        self.cells_by_label = {label: cell
+                               for cell, label in enumerate(self.labels)}
+        keys = random_keys(2 * len(self.cell_lines)
+                           + 2 * len(self.line_cells) + 1, length)
+        self.cell_keys = keys[:2 * len(self.cell_lines)]
+        self.line_keys = keys[2 * len(self.cell_lines):-1]
+        self.board_key = keys[-1]
+        self.symmetries = self.find_symmetries()
+        self.symmetry_keys = [(self.byte_keys(cells, 0),
+                               self.byte_keys(cells, 1),
+                               [self.line_keys[2 * images[claim // 2]
+                                               + claim % 2]
+                                for claim in range(len(self.line_keys))])
+                              for cells, images in self.symmetries]
+
+    def byte_keys(self, cells: tuple, player: int) -> list:
+        """
+        Return, for each group of 8 cells, a table of the combined keys of
+        player (0 for p1, 1 for p2) holding the images under cells of the
+        cells set in each possible byte of a cell bitmask.
+        """
+        tables = []
+        for start in range(0, len(cells), 8):
+            table = [0] * 256
+            for byte in range(1, 256):
+                low = (byte & -byte).bit_length() - 1
+                table[byte] = table[byte & (byte - 1)]
+                if start + low < len(cells):
+                    table[byte] ^= self.cell_keys[2 * cells[start + low]
+                                                  + player]
+            tables.append(table)
+        return tables
+
+    def find_symmetries(self) -> list:
+        """
+        Return the symmetries of the board, as described for symmetries.
+
+        Each ley-line keeps one of three hex coordinates of its cells
+        constant, so every permutation of the coordinates, with or without
+        a change of sign, is a candidate. A candidate is a symmetry if it
+        maps the cells onto themselves once lined up with them.
+
+        >>> [len(LeyLineIndex(n).symmetries) for n in range(1, 6)]
+        [6, 12, 6, 6, 6]
+        """
+        # cube coordinates, which add up to 0, from the row and up ley-lines
+        coordinates = [(up - self.length - 1, -row, row - up + self.length + 1)
+                       for row, up, _ in self.cell_lines]
+        positions = {point: cell for cell, point in enumerate(coordinates)}
+        lines = {cells: line for line, cells in enumerate(self.line_cells)}
+        symmetries = []
+        for order in itertools.permutations(range(3)):
+            for sign in [1, -1]:
+                moved = [tuple(sign * point[k] for k in order)
+                         for point in coordinates]
+                shift = [min(point[k] for point in coordinates)
+                         - min(point[k] for point in moved)
+                         for k in range(3)]
+                moved = [tuple(point[k] + shift[k] for k in range(3))
+                         for point in moved]
+                if not all(point in positions for point in moved):
+                    continue
+                cells = tuple(positions[point] for point in moved)
+                images = tuple(lines.get(tuple(sorted(cells[cell]
+                                                      for cell in line)))
+                               for line in self.line_cells)
+                if None not in images and (cells, images) not in symmetries:
+                    symmetries.append((cells, images))
+        return symmetries
+
+
+LEY_LINE_INDEXES = {}
+
+
+def get_ley_line_index(length: int) -> LeyLineIndex:
+    """
+    Return the LeyLineIndex for side length length, building it only the
+    first time.
+
+    >>> get_ley_line_index(2) is get_ley_line_index(2)
+    True
+    """
+    if length not in LEY_LINE_INDEXES:
+        LEY_LINE_INDEXES[length] = LeyLineIndex(length)
+    return LEY_LINE_INDEXES[length]
+
+
+class BoardTemplate:
+    """
+    The drawing of an empty board of one side length, where every state of
+    that side length fills in its cells and ley-line markers.
+
+    Attribute:
+    rows: the rows of items drawn by stone_generator
+    cells: the (row, column) of each cell in rows
+    markers: the (row, column) of each ley-line marker in rows
+    text: rows as a str.format template with one field per cell, then per
+          marker, each padded to the width of the longest label
+    """
+    rows: tuple
+    cells: list
+    markers: list
+    text: str
+
+    def __init__(self, length: int) -> None:
+        """
+        Initialize the template of a board of side length length.
+
+        >>> print(BoardTemplate(1).text)
+              {5}   {6}
+             /   /
+        {3} - {0} - {1}
+             \\ / \\
+          {4} - {2}   {8}
+               \\
+                {7}
+        """
+        self.rows = tuple(tuple(row) for row in stone_generator(length))
+        self.cells, self.markers = get_drawing_positions(self.rows)
+        width = len(get_ley_line_index(length).labels[-1])
+        fields = {position: field for field, position
+                  in enumerate(self.cells + self.markers)}
+        lines = []
+        for row, items in enumerate(self.rows):
+            # pieces are format fields or padded characters; whatever pads
+            # the end of a row is left out, as rstrip would
+            pieces = [(fields[(row, column)] if (row, column) in fields
+                       else item.ljust(width).replace('{', '{{')
+                       .replace('}', '}}'))
+                      for column, item in enumerate(items)]
+            while pieces and isinstance(pieces[-1], str) \
+                    and not pieces[-1].strip():
+                pieces.pop()
+            if pieces and isinstance(pieces[-1], str):
+                pieces[-1] = pieces[-1].rstrip()
+            lines.append(''.join(
+                piece if isinstance(piece, str) else
+                '{%d}' % piece if i == len(pieces) - 1 or width == 1 else
+                '{%d:<%d}' % (piece, width)
+                for i, piece in enumerate(pieces)))
+        self.text = '\n'.join(lines)
+
+
+BOARD_TEMPLATES = {}
+
+
+def get_board_template(length: int) -> BoardTemplate:
+    """
+    Return the BoardTemplate for side length length, building it only the
+    first time.
+
+    >>> get_board_template(2) is get_board_template(2)
+    True
+    """
+    if length not in BOARD_TEMPLATES:
+        BOARD_TEMPLATES[length] = BoardTemplate(length)
+    return BOARD_TEMPLATES[length]
+
+
+def get_drawing_positions(board: list) -> tuple:
+    """
+    Return the (row, column) of every cell and of every ley-line marker in
+    board, a drawing made by stone_generator.
+
+    >>> cells, markers = get_drawing_positions(stone_generator(1))
+    >>> cells
+    [(2, 4), (2, 8), (4, 6)]
+    >>> markers
+    [(2, 0), (4, 2), (0, 6), (0, 10), (6, 8), (4, 10)]
+    """
+    length = (len(board) - 5) // 2
+    cells = []
+    rows = []
+    ups = []
+    downs = []
+    for row, items in enumerate(board):
+        at = [column for column, item in enumerate(items) if item == '@']
+        cells.extend((row, column) for column, item in enumerate(items)
+                     if item.isalpha())
+        if row == 0:
+            ups.extend((row, column) for column in at)
+        elif row == len(board) - 1:
+            downs = [(row, column) for column in at] + downs
+        elif at:
+            rows.append((row, at[0]))
+            if len(at) > 1 and len(rows) <= length:
+                ups.append((row, at[1]))
+            elif len(at) > 1:
+                downs.append((row, at[1]))
+    return cells, rows + ups + downs
+
+
+def cell_label(cell: int) -> str:
+    """
+    Return the label of cell: A to Z for the first 26 cells, then AA, AB
+    and so on.
+
+    >>> [cell_label(i) for i in [0, 25, 26, 51, 52, 701, 702]]
+    ['A', 'Z', 'AA', 'AZ', 'BA', 'ZZ', 'AAA']
+    """
+    label = ''
+    cell += 1
+    while cell > 0:
+        cell, remainder = divmod(cell - 1, 26)
+        label = chr(ord('A') + remainder) + label
+    return label
 
 
 def stone_generator(n):
     """
     Generate a Stonehenge.
+
+    Rows are built with extend, and labels are taken in order, so the time
+    taken is linear in the size of the drawing.
+
+    >>> [''.join(row) for row in stone_generator(1)][2::2]
+    ['@ - A - B', '  @ - C   @', '        @']
     """
-    copy = LETTERS[:]
+    labels = get_ley_line_index(n).labels
+    label = 0
     empty = []
     h = n
-    i = 2
     get_begin_rows(empty, h)
-    while i < h+2:
-        empty_1 = []
-        x = 0
-        while x < i - 1:
-            empty_1.append([copy.pop(0), ' ', '-', ' '])
-            x += 1
-        if i == (h + 1):
-            empty_1.append([copy.pop(0)])
+    for i in range(2, h + 2):
+        row = []
+        for _ in range(i - 1):
+            row.extend([labels[label], ' ', '-', ' '])
+            label += 1
+        if i == h + 1:
+            row.append(labels[label])
         else:
-            empty_1.append([copy.pop(0), ' ', ' ', ' ', '@'])
+            row.extend([labels[label], ' ', ' ', ' ', '@'])
+        label += 1
 
-        empty.append(insert_space(sum(empty_1, []), h, i))
+        empty.append(insert_space(row, h, i))
         if i != h + 1:
             empty.append(get_diagonals(h, i))
-
-        i += 1
     empty.append([' ', ' ', ' ', ' ', ' '] + get_diagonal_2(h))
 
-    empty_2 = []
-    for x in range(h - 1):
-        empty_2.append([copy.pop(0), ' ', '-', ' '])
-    empty_2.append([copy.pop(0), ' ', ' ', ' ', '@'])
-    empty.append([' ', ' ', '@', ' ', '-', ' '] + sum(empty_2, []))
+    row = [' ', ' ', '@', ' ', '-', ' ']
+    for _ in range(h - 1):
+        row.extend([labels[label], ' ', '-', ' '])
+        label += 1
+    row.extend([labels[label], ' ', ' ', ' ', '@'])
+    empty.append(row)
     get_ending_rows(empty, h)
     empty[-1] = empty[-1][:-3]
     empty[-2] = empty[-2][:-3]
@@ -584,33 +960,23 @@ def get_ending_rows(alist, size):
     """
     Add ending rows to alist.
     """
-    sta = ['\\', ' ', ' ', ' ']
-    alist.append([' ', ' ', ' ', ' ', ' ', ' ', ' '] +
-                 sum([sta for i in range(size)], []))
-    sta_1 = ['@', ' ', ' ', ' ']
-    alist.append([' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '] +
-                 sum([sta_1 for ii in range(size)], []))
+    alist.append([' '] * 7 + ['\\', ' ', ' ', ' '] * size)
+    alist.append([' '] * 8 + ['@', ' ', ' ', ' '] * size)
 
 
 def get_begin_rows(alist, size):
     """
     Modify alist by adding beginning row to it.
     """
-    alist.append([' ' for i in range(2*size + 4)] + ['@', ' ', ' ', ' ', '@'])
-    alist.append([' ' for s in range(2*size + 3)] + ['/', ' ', ' ', ' ', '/'])
+    alist.append([' '] * (2*size + 4) + ['@', ' ', ' ', ' ', '@'])
+    alist.append([' '] * (2*size + 3) + ['/', ' ', ' ', ' ', '/'])
 
 
 def get_diagonal_2(size):
     """
     Return a list of proper diagonals.
     """
-    empty = []
-    x = 0
-    while x < size:
-        empty.append(['\\', ' ', '/', ' '])
-        x += 1
-    empty.append(['\\'])
-    return sum(empty, [])
+    return ['\\', ' ', '/', ' '] * size + ['\\']
 
 
 def insert_space(alist, size, row):
@@ -618,33 +984,15 @@ def insert_space(alist, size, row):
     Return a list with proper white spaces inserted to alist based on row and
     size.
     """
-    num = 2*(size-(row-1))
-    empty = []
-    x = 0
-    while x < num:
-        empty.append(' ')
-        x += 1
-    empty_1 = [empty, ['@', ' ', '-', ' '], alist]
-    return sum(empty_1, [])
+    return [' '] * (2*(size-(row-1))) + ['@', ' ', '-', ' '] + alist
 
 
 def get_diagonals(size, row):
     """
     Return a diagonal base on size and number of cells in the row.
     """
-    white_space = 3 + 2*(size - (row - 1))
-    empty = []
-    x = 0
-    while x < white_space:
-        empty.append([' '])
-        x += 1
-    standard = ['/', ' ', '\\', ' ']
-    x = 0
-    while x < row:
-        empty.append(standard)
-        x += 1
-    empty.append(['/'])
-    return sum(empty, [])
+    return [' '] * (3 + 2*(size - (row - 1))) + ['/', ' ', '\\', ' '] * row \
+        + ['/']
 
 
 if __name__ == '__main__':
@@ -5,8 +5,64 @@ NOTE: Make sure this file adheres to python-ta.
 Adjust the type annotations as needed, and implement both a recursive
 and an iterative version of minimax.
 """
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Union
-from stack import Stack, Tree
+from stack import (CycleSearch, DepthSearch, Frame, MonteCarloNode, Stack,
+                   Tree)
+from transposition import TranspositionTable
+from opening_book import OpeningBook
+from dfpn import DfpnSolver, SearchStopped
+from subtract_square_state import SubtractSquareState
+from subtract_square_solver import get_solver
+
+# Scores of solved states, shared by reminimax and get_score. Inspect
+# TABLE.stats() for the hit/miss counters when sizing it. Setting
+# TABLE.canonical lets symmetric positions share their scores, at the cost
+# of a slower key for every lookup.
+TABLE = TranspositionTable()
+
+
+class SearchContext(threading.local):
+    """
+    What a search needs to know about the decision it is part of, separately
+    for each thread.
+
+    Attribute:
+    stats: the SearchStats of the decision being instrumented in this
+           thread, or None. Set by instrumentation.run_instrumented; see
+           that module.
+    stop: a threading.Event that stops the searches of this thread once it
+          is set, or None. Set by ponder.Ponderer.
+    """
+    stats = None
+    stop = None
+
+
+# Strategies read SEARCH.stats once per call, so a decision pondered in
+# another thread is neither counted in nor broken by an instrumented one.
+SEARCH = SearchContext()
+
+
+class SearchTimeout(Exception):
+    """
+    Raised when a timed search runs past its deadline, or a search is
+    stopped through SEARCH.stop.
+    """
+
+
+def check_stop() -> None:
+    """
+    Raise SearchTimeout if the searches of this thread have been asked to
+    stop.
+    """
+    stop = SEARCH.stop
+    if stop is not None and stop.is_set():
+        raise SearchTimeout
 
 # TODO: Adjust the type annotation as needed.
 
@@ -39,13 +95,20 @@ def rough_outcome_strategy(game: Any) -> Any:
         'guess' the outcome of the game, but no further. It's better than
         random, but worse than minimax.
     """
+    stats = SEARCH.stats
     current_state = game.current_state
     best_move = None
     best_outcome = -2 # Temporarily -- just so we can replace this easily later
 
+    if stats is not None:
+        stats.expand(0, len(current_state.get_possible_moves()))
+
     # Get the move that results in the lowest rough_outcome for the opponent
     for move in current_state.get_possible_moves():
         new_state = current_state.make_move(move)
+        if stats is not None:
+            stats.make_moves += 1
+            stats.leaf(1)
 
         # We multiply the below by -1 since a state that's bad for the opponent
         # is good for us.
@@ -65,8 +128,12 @@ def reminimax(game: Any) -> Any:
     """
     Return the best move for current state.
     """
+    stats = SEARCH.stats
     current = game.current_state
     moves = game.current_state.get_possible_moves()
+    if stats is not None:
+        stats.expand(0, len(moves))
+        stats.make_moves += len(moves)
     empty = []
     for i in moves:
         state = current
@@ -75,64 +142,788 @@ def reminimax(game: Any) -> Any:
     return max(empty)[1]
 
 
-def get_score(game: Any, state: Any) -> int:
+def get_score(game: Any, state: Any, ply: int = 1) -> int:
     """
-    Return the score for the current state player.
+    Return the score for the current state player, where state is ply moves
+    below the state being decided on.
+
+    Scores are cached in TABLE, so a position reached through different move
+    orders is only searched once.
     """
-    if state.get_possible_moves() == []:
-        return result(game, state)
-    return max([-1 * get_score(game, state.make_move(x))
-                for x in state.get_possible_moves()])
+    stats = SEARCH.stats
+    check_stop()
+    key = TABLE.key_of(state)
+    score = TABLE.get(key)
+    if score is not None:
+        return score
+    moves = state.get_possible_moves()
+    if stats is not None:
+        if moves:
+            stats.expand(ply, len(moves))
+        else:
+            stats.terminal(ply)
+        stats.make_moves += len(moves)
+    if moves == []:
+        score = result(state)
+    else:
+        score = max([-1 * get_score(game, state.make_move(x), ply + 1)
+                     for x in moves])
+    TABLE.put(key, score)
+    return score
 
 
-def result(game: Any, state: Any) -> int:
+def result(state: Any) -> int:
     """
     Return the score for the current position of the current player.
+
+    Only state is looked at, so no game is changed and one game can be
+    shared by searches running at the same time.
+    """
+    winner = state.winner()
+    if winner is None:
+        return state.DRAW
+    elif winner == state.get_current_player_name():
+        return state.WIN
+    return state.LOSE
+
+
+def abminimax(game: Any) -> Any:
+    """
+    Return the best move for the current state, using minimax with
+    alpha-beta pruning.
+
+    Scores are only -1, 0 or 1, so the search stops at the first winning
+    move it finds.
+    """
+    stats = SEARCH.stats
+    current = game.current_state
+    best_move = None
+    best_score = current.LOSE - 1
+    children = order_children(game, current)
+    if stats is not None:
+        stats.expand(0, len(children))
+    for move, state in children:
+        score = -1 * get_ab_score(game, state, current.LOSE - 1,
+                                  -1 * best_score)
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if best_score >= current.WIN:
+            break
+    return best_move
+
+
+def get_ab_score(game: Any, state: Any, alpha: int, beta: int,
+                 ply: int = 1) -> int:
+    """
+    Return the score for the current state player, searching only for
+    scores strictly between alpha and beta. state is ply moves below the
+    state being decided on.
+
+    A score at or below alpha is an upper bound, and a score at or above
+    beta is a lower bound. Only exact scores are cached in TABLE. A state
+    with a move that wins at once scores WIN without being searched.
+    """
+    stats = SEARCH.stats
+    check_stop()
+    key = TABLE.key_of(state)
+    score = TABLE.get(key)
+    if score is not None:
+        return score
+    score = get_immediate_score(state, key, ply)
+    if score is not None:
+        return score
+
+    best_score = state.LOSE - 1
+    lower = alpha
+    children = order_children(game, state)
+    if stats is not None:
+        stats.expand(ply, len(children))
+    for _, child in children:
+        score = -1 * get_ab_score(game, child, -1 * beta, -1 * lower,
+                                  ply + 1)
+        best_score = max(best_score, score)
+        lower = max(lower, best_score)
+        if lower >= beta or best_score >= state.WIN:
+            break
+
+    if (alpha < best_score < beta or best_score == state.WIN
+            or best_score == state.LOSE):
+        TABLE.put(key, best_score)
+    return best_score
+
+
+def get_immediate_score(state: Any, key: Any, ply: int) -> Any:
+    """
+    Return the score for the current state player if the game is over at
+    state or a move wins at once, and cache it in TABLE under key. Return
+    None if state must be searched. state is ply moves below the state being
+    decided on.
+    """
+    stats = SEARCH.stats
+    if state.get_possible_moves() == []:
+        if stats is not None:
+            stats.terminal(ply)
+        score = result(state)
+    elif state.winning_moves() != []:
+        if stats is not None:
+            stats.leaf(ply)
+        score = state.WIN
+    else:
+        return None
+    TABLE.put(key, score)
+    return score
+
+
+def order_children(game: Any, state: Any, scores: dict = None) -> list:
+    """
+    Return a list of (move, new state) pairs for state, most promising
+    first for the current player.
+
+    Moves that end the game come first, then moves whose cached score is
+    worst for the opponent. Other moves keep their original order. Scores
+    are looked up in scores, by key, before TABLE if scores is given.
+    """
+    stats = SEARCH.stats
+    children = [(move, state.make_move(move))
+                for move in state.get_possible_moves()]
+    if stats is not None:
+        stats.make_moves += len(children)
+    if scores is None:
+        scores = {}
+    ranks = []
+    for _, child in children:
+        if game.is_over(child):
+            ranks.append(state.LOSE - 1)
+            continue
+        key = TABLE.key_of(child)
+        rank = scores.get(key)
+        if rank is None:
+            rank = TABLE.peek(key)
+        if stats is not None:
+            stats.lookup(rank)
+        ranks.append(state.DRAW if rank is None else rank)
+    order = sorted(range(len(children)), key=ranks.__getitem__)
+    return [children[i] for i in order]
+
+
+def timed_minimax(game: Any, time_limit: float = 1.0) -> Any:
+    """
+    Return the best move found by searching the current state to depth 1, 2,
+    3 and so on until time_limit seconds have passed.
+
+    Positions at the depth limit are scored with rough_outcome. The move
+    returned comes from the deepest search that finished, and the search
+    stops early once a depth reaches the end of every line of play.
+    """
+    current = game.current_state
+    deadline = time.perf_counter() + time_limit
+    moves = current.get_possible_moves()
+    best_move = moves[0] if moves else None
+    depth = 1
+    complete = False
+    while not complete:
+        # the previous best move is searched first at each new depth
+        if best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+        search = DepthSearch(game, depth, deadline)
+        iteration_move, timed_out = search_to_depth(search, moves)
+        if timed_out:
+            if depth == 1 and iteration_move is not None:
+                best_move = iteration_move
+            break
+        best_move = iteration_move
+        complete = search.cut == []
+        depth += 1
+    return best_move
+
+
+def search_to_depth(search: DepthSearch, moves: list) -> tuple:
+    """
+    Return the best of moves from the current state, searching as in
+    get_depth_score, and whether the deadline of search passed first. If it
+    did, the move is the best of the moves searched so far, or None.
+    """
+    stats = SEARCH.stats
+    current = search.game.current_state
+    best_move = None
+    best_score = current.LOSE - 1
+    if stats is not None:
+        stats.expand(0, len(moves))
+    for move in moves:
+        if stats is not None:
+            stats.make_moves += 1
+        try:
+            score = -1 * get_depth_score(current.make_move(move),
+                                         current.LOSE - 1, -1 * best_score,
+                                         search)
+        except SearchTimeout:
+            return best_move, True
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if best_score >= current.WIN and search.cut == []:
+            break
+    return best_move, False
+
+
+def get_depth_score(state: Any, alpha: float, beta: float,
+                    search: DepthSearch, ply: int = 1) -> float:
+    """
+    Return the score for the current state player, searching with alpha-beta
+    pruning down to search.depth moves below the state being decided on,
+    and scoring the positions there with rough_outcome. state is ply moves
+    below the state being decided on.
+
+    Raise SearchTimeout once the deadline of search has passed. Add state
+    to search.cut if the depth limit stopped the search there. Scores of
+    positions searched to the end of every line of play are exact, and are
+    cached in TABLE as in get_ab_score, so later depths do not search them
+    again.
+    """
+    stats = SEARCH.stats
+    check_stop()
+    if time.perf_counter() > search.deadline:
+        raise SearchTimeout
+    key = TABLE.key_of(state)
+    score = TABLE.get(key)
+    if score is not None:
+        return score
+    score = get_immediate_score(state, key, ply)
+    if score is not None:
+        return score
+    if ply >= search.depth:
+        if stats is not None:
+            stats.leaf(ply)
+        search.cut.append(state)
+        return state.rough_outcome()
+
+    best_score = state.LOSE - 1
+    cut_before = len(search.cut)
+    children = order_children(search.game, state)
+    if stats is not None:
+        stats.expand(ply, len(children))
+    for _, child in children:
+        score = -1 * get_depth_score(child, -1 * beta,
+                                     -1 * max(alpha, best_score), search,
+                                     ply + 1)
+        best_score = max(best_score, score)
+        if best_score >= beta or best_score >= state.WIN:
+            break
+    # a score at or above beta is only a lower bound, and one at or below
+    # alpha only an upper bound, unless nothing is better or worse
+    if len(search.cut) == cut_before and (best_score < beta
+                                          or best_score == state.WIN) \
+            and (best_score > alpha or best_score == state.LOSE):
+        TABLE.put(key, best_score)
+    return best_score
+
+
+def cycle_minimax(game: Any, max_nodes: int = 100000,
+                  max_depth: int = 400) -> Any:
+    """
+    Return the best move for the current state, using minimax with
+    alpha-beta pruning, for games where a position can come back, such as
+    Chopsticks.
+
+    A position that repeats one on the current line of play is a draw. At
+    most max_nodes positions are expanded, and none more than max_depth
+    moves below the current state, so every decision ends in bounded time;
+    past either limit positions are scored with rough_outcome.
+
+    Whether a position repeats depends on the line of play that reached
+    it, so the scores of searched positions are only kept for this
+    decision. TABLE only keeps scores of finished games and of positions
+    with a winning move, which no line of play changes.
+
+    >>> from subtract_square_game import SubtractSquareGame
+    >>> cycle_minimax(SubtractSquareGame(True, 28))
+    16
+    """
+    stats = SEARCH.stats
+    current = game.current_state
+    search = CycleSearch(game, max_nodes, max_depth)
+    search.path[TABLE.key_of(current)] = 0
+    best_move = None
+    best_score = current.LOSE - 1
+    children = order_children(game, current)
+    if stats is not None:
+        stats.expand(0, len(children))
+    for move, state in children:
+        score = -1 * get_cycle_score(state, current.LOSE - 1,
+                                     -1 * best_score, search)[0]
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if best_score >= current.WIN:
+            break
+    return best_move
+
+
+def get_cycle_score(state: Any, alpha: float, beta: float,
+                    search: CycleSearch, ply: int = 1) -> tuple:
+    """
+    Return the score for the current state player as in get_ab_score, and
+    the smallest ply of a position on search.path that the score relies on
+    being repeated. state is ply moves below the state being decided on.
+
+    The ply is math.inf if no repetition of a position above state was
+    found, and -1 if the score is only a rough_outcome guess. Only such
+    scores are kept in search.scores, the cache of this decision: a draw by
+    repetition found below state may not be a repetition when state is
+    reached another way.
+    """
+    stats = SEARCH.stats
+    check_stop()
+    key = TABLE.key_of(state)
+    known = get_cycle_leaf_score(state, key, search, ply)
+    if known is not None:
+        return known
+
+    search.budget -= 1
+    search.path[key] = ply
+    best_score = state.LOSE - 1
+    lower = alpha
+    repeated = math.inf
+    children = order_children(search.game, state, search.scores)
+    if stats is not None:
+        stats.expand(ply, len(children))
+    for _, child in children:
+        score, child_repeated = get_cycle_score(child, -1 * beta, -1 * lower,
+                                                search, ply + 1)
+        best_score = max(best_score, -1 * score)
+        repeated = min(repeated, child_repeated)
+        lower = max(lower, best_score)
+        if lower >= beta or best_score >= state.WIN:
+            break
+    del search.path[key]
+
+    # repeating state itself is a draw however state is reached
+    if repeated >= ply:
+        repeated = math.inf
+        if (alpha < best_score < beta or best_score == state.WIN
+                or best_score == state.LOSE):
+            search.scores[key] = best_score
+    return best_score, repeated
+
+
+def get_cycle_leaf_score(state: Any, key: Any, search: CycleSearch,
+                         ply: int) -> Any:
+    """
+    Return the score and repetition ply of state, whose key is key, as in
+    get_cycle_score if they are known without expanding state, or None.
+
+    A repetition of a position on search.path is a draw, and past the
+    budget or max_depth of search, state is scored with rough_outcome.
+    """
+    stats = SEARCH.stats
+    if key in search.path:
+        if stats is not None:
+            stats.leaf(ply)
+        return state.DRAW, search.path[key]
+    score = search.scores.get(key)
+    if score is None:
+        # TABLE counts its own lookups
+        score = TABLE.get(key)
+    elif stats is not None:
+        stats.lookup(score)
+    if score is None:
+        score = get_immediate_score(state, key, ply)
+    if score is not None:
+        return score, math.inf
+    if search.budget <= 0 or ply >= search.max_depth:
+        if stats is not None:
+            stats.leaf(ply)
+        return state.rough_outcome(), -1
+    return None
+
+
+# Process pools used by parallel_minimax, by number of workers. Pools are
+# kept between moves so that workers keep their transposition tables.
+POOLS = {}
+
+
+def parallel_minimax(game: Any, workers: int = None) -> Any:
+    """
+    Return the same move as reminimax, scoring the positions after the
+    current state in parallel worker processes.
+
+    Each move from the current state is searched in its own task. When there
+    are fewer moves than workers, the positions two moves ahead are split
+    into tasks instead.
+    """
+    stats = SEARCH.stats
+    current = game.current_state
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers not in POOLS:
+        POOLS[workers] = ProcessPoolExecutor(workers)
+    pool = POOLS[workers]
+
+    moves = current.get_possible_moves()
+    split = len(moves) < workers
+    if stats is not None:
+        stats.expand(0, len(moves))
+    tasks = []
+    for move in moves:
+        state = current.make_move(move)
+        replies = state.get_possible_moves()
+        if not split or replies == []:
+            tasks.append((move, None, pool.submit(get_parallel_score,
+                                                  game, state)))
+        else:
+            for reply in replies:
+                tasks.append((move, reply, pool.submit(
+                    get_parallel_score, game, state.make_move(reply))))
+
+    scores = gather_scores(current, tasks)
+    return max([[scores[move], move] for move in moves])[1]
+
+
+def gather_scores(current: Any, tasks: list) -> dict:
+    """
+    Return the score of each move from current, from the (move, reply,
+    future) tasks of parallel_minimax.
+
+    If the search is stopped through SEARCH.stop, the tasks not started yet
+    are cancelled and SearchTimeout is raised. A task already running in a
+    worker still finishes.
+    """
+    stop = SEARCH.stop
+    scores = {}
+    for move, reply, task in tasks:
+        if stop is not None and stop.is_set():
+            for _, _, pending in tasks:
+                pending.cancel()
+            raise SearchTimeout
+        if reply is None:
+            scores[move] = -1 * task.result()
+        else:
+            # the opponent picks the reply that is best for them
+            scores[move] = min(scores.get(move, current.WIN), task.result())
+    return scores
+
+
+def get_parallel_score(game: Any, state: Any) -> int:
+    """
+    Return the exact score for the current player of state. This runs in a
+    worker process of parallel_minimax, using that process's TABLE.
+    """
+    return get_ab_score(game, state, state.LOSE - 1, state.WIN + 1)
+
+
+# The tree of the last Monte Carlo search, reused by the next search when
+# its state is found within two moves of the old root.
+MCTS_TREE = {'root': None}
+
+# Playout counts and timing of the last Monte Carlo search.
+MCTS_STATS = {'playouts': 0, 'seconds': 0.0, 'playouts_per_second': 0.0}
+
+
+def mcts_strategy(game: Any, iterations: int = None,
+                  time_limit: float = None, exploration: float = 1.4) -> Any:
+    """
+    Return the most visited move after a Monte Carlo tree search (UCT) from
+    the current state, with random playouts.
+
+    The search stops after iterations playouts or time_limit seconds,
+    whichever comes first, or after 1000 playouts if neither is given. The
+    tree is kept for the next call in the same game. Playouts per second are
+    recorded in MCTS_STATS.
+    """
+    current = game.current_state
+    if iterations is None and time_limit is None:
+        iterations = 1000
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+
+    root = find_subtree(MCTS_TREE['root'], current)
+    root.parent = None
+    playouts = 0
+    while ((iterations is None or playouts < iterations)
+           and (deadline is None or time.perf_counter() < deadline)):
+        check_stop()
+        node, ply = select_and_expand(root, exploration)
+        back_propagate(node, random_playout(node.state, ply))
+        playouts += 1
+
+    seconds = time.perf_counter() - start
+    MCTS_STATS['playouts'] = playouts
+    MCTS_STATS['seconds'] = seconds
+    MCTS_STATS['playouts_per_second'] = playouts / seconds if seconds else 0.0
+    MCTS_TREE['root'] = root
+    if root.children == []:
+        return None
+    return max(root.children, key=lambda x: x.visits).move
+
+
+def find_subtree(root: Union[None, MonteCarloNode],
+                 state: Any) -> MonteCarloNode:
+    """
+    Return the node for state among root and the nodes up to two moves
+    below it, or a new node if there is none.
     """
-    game.current_state = state
-    name = state.get_current_player_name()
-    if game.is_winner(name):
-        return 1
-    elif game.is_winner('p1') or game.is_winner('p2'):
-        return -1
-    return 0
+    if root is None:
+        return MonteCarloNode(state)
+    nodes = [root] + root.children
+    for child in root.children:
+        nodes.extend(child.children)
+    for node in nodes:
+        if node.state == state:
+            return node
+    return MonteCarloNode(state)
+
+
+def select_and_expand(root: MonteCarloNode, exploration: float) -> tuple:
+    """
+    Return the node a playout of a Monte Carlo search from root starts at,
+    and how many moves below root it is.
+
+    A leaf is selected by following select_child from root, then expanded
+    by one of its untried moves, picked at random.
+    """
+    stats = SEARCH.stats
+    node = root
+    ply = 0
+    while node.untried == [] and node.children != []:
+        node = select_child(node, exploration)
+        ply += 1
+    if node.untried != []:
+        if stats is not None:
+            if node.children == []:
+                stats.expand(ply, len(node.untried))
+            stats.make_moves += 1
+        move = node.untried.pop(random.randrange(len(node.untried)))
+        child = MonteCarloNode(node.state.make_move(move), node, move)
+        node.children.append(child)
+        node = child
+        ply += 1
+    return node, ply
+
+
+def select_child(node: MonteCarloNode, exploration: float) -> MonteCarloNode:
+    """
+    Return the child of node with the highest upper confidence bound.
+    """
+    log_visits = math.log(node.visits)
+    return max(node.children,
+               key=lambda x: x.wins / x.visits
+               + exploration * math.sqrt(log_visits / x.visits))
+
+
+def random_playout(state: Any, ply: int = 0) -> int:
+    """
+    Return the score for p1 after playing random moves from state, ply moves
+    below the root of the search, until the game ends. state itself is not
+    changed.
+    """
+    stats = SEARCH.stats
+    start = ply
+    moves = state.get_possible_moves()
+    if moves != []:
+        state = state.make_move(random.choice(moves))
+        ply += 1
+        moves = state.get_possible_moves()
+        while moves != []:
+            state.apply_move(random.choice(moves))
+            ply += 1
+            moves = state.get_possible_moves()
+    if stats is not None:
+        stats.playouts += 1
+        stats.terminal(ply)
+        stats.make_moves += ply - start
+    score = result(state)
+    if state.get_current_player_name() == 'p1':
+        return score
+    return -1 * score
+
+
+def back_propagate(node: MonteCarloNode, p1_score: int) -> None:
+    """
+    Add the playout with p1_score to node and every node above it, rewarding
+    the player who moved into each node with 1 for a win, 0.5 for a draw and
+    0 for a loss.
+    """
+    while node is not None:
+        node.visits += 1
+        if node.state.get_current_player_name() == 'p2':
+            node.wins += (1 + p1_score) / 2
+        else:
+            node.wins += (1 - p1_score) / 2
+        node = node.parent
+
+
+def solved_strategy(game: Any) -> Any:
+    """
+    Return a perfect move for Subtract Square from a precomputed win table,
+    or the abminimax move for any other game.
+    """
+    current = game.current_state
+    if isinstance(current, SubtractSquareState):
+        return get_solver(current.current_total).best_move(
+            current.current_total)
+    return abminimax(game)
+
+
+# Opening books opened by book_strategy, by path. Their files are memory
+# mapped, so every process shares the pages of one file.
+BOOKS = {}
+
+
+def book_strategy(game: Any, path: str = 'opening.book') -> Any:
+    """
+    Return the best move stored for the current state in the opening book
+    at path, written by opening_book.py, or the abminimax move if the book
+    or the position is missing.
+    """
+    if path not in BOOKS:
+        try:
+            BOOKS[path] = OpeningBook(path)
+        except FileNotFoundError:
+            return abminimax(game)
+    move = BOOKS[path].best_move(game.current_state)
+    if move is None:
+        return abminimax(game)
+    return move
+
+
+# The solver of dfpn_strategy. Its table is kept between moves, since the
+# positions after a proven move are mostly proven already.
+DFPN = DfpnSolver()
+
+
+def dfpn_strategy(game: Any) -> Any:
+    """
+    Return a move that df-pn search proves wins, or the first move if the
+    current state is lost.
+
+    >>> from subtract_square_game import SubtractSquareGame
+    >>> dfpn_strategy(SubtractSquareGame(True, 28))
+    16
+    """
+    stats = SEARCH.stats
+    hits = DFPN.table.hits
+    misses = DFPN.table.misses
+    DFPN.stats = stats
+    DFPN.stop = SEARCH.stop
+    try:
+        return DFPN.best_move(game.current_state)
+    except SearchStopped:
+        raise SearchTimeout from None
+    finally:
+        DFPN.stats = None
+        DFPN.stop = None
+        if stats is not None:
+            stats.cache_hits += DFPN.table.hits - hits
+            stats.cache_misses += DFPN.table.misses - misses
 
 
 # TODO: Implement an iterative version of the minimax strategy.
 
 
-def itminimax(game: Any) -> Any:
+def itminimax(game: Any, bounded: bool = False) -> Any:
     """
     Return a best move based the current state.
+
+    If bounded is True, use bounded_itminimax, which only keeps the current
+    search path in memory.
     """
+    stats = SEARCH.stats
+    if bounded:
+        return bounded_itminimax(game)
     current = game.current_state
     my_stack = Stack()
     initial = Tree(current)
     my_stack.add(initial)
     empty = []
     while not my_stack.is_empty():
+        check_stop()
         a = my_stack.remove()
-        game.current_state = a.state
-        if game.is_over(a.state):
-            if game.is_winner(a.state.get_current_player_name()):
-                a.score = 1
-                game.current_state = current
-            elif game.is_winner('p1') or game.is_winner('p2'):
-                a.score = -1
-                game.current_state = current
+        if stats is not None and a.score is None and a.children == []:
+            if game.is_over(a.state):
+                stats.terminal(a.depth)
             else:
-                a.score = 0
-                game.current_state = current
+                stats.expand(a.depth, len(a.state.get_possible_moves()))
+                stats.make_moves += len(a.state.get_possible_moves())
+        if game.is_over(a.state):
+            a.score = result(a.state)
         elif a.children == []:
             creat_new_items(my_stack, a)
-            game.current_state = current
         else:
             a.score = max([-1 * x.score for x in a.children])
-            game.current_state = current
         empty.append(a)
     return get_move(empty[0])
 
 
+def bounded_itminimax(game: Any) -> Any:
+    """
+    Return a best move based on the current state, searching iteratively
+    while keeping only the frames of the current path.
+
+    A frame and its state are dropped as soon as its score is known, so
+    memory grows with depth times branching rather than with the size of the
+    game tree. Solved scores are shared through TABLE.
+    """
+    stats = SEARCH.stats
+    current = game.current_state
+    root = Frame(current)
+    if stats is not None:
+        stats.expand(0, len(current.get_possible_moves()))
+    my_stack = Stack()
+    my_stack.add(root)
+    while not my_stack.is_empty():
+        check_stop()
+        frame = my_stack.remove()
+        move = None
+        if frame.score is None or frame.score < frame.state.WIN:
+            move = next(frame.moves, None)
+        if move is not None:
+            my_stack.add(frame)
+            child = new_frame(game, frame, move)
+            if child.score is None:
+                my_stack.add(child)
+            else:
+                update_parent(child)
+        elif frame.parent is not None:
+            if frame.score is None:
+                frame.score = result(frame.state)
+            TABLE.put(TABLE.key_of(frame.state), frame.score)
+            update_parent(frame)
+    return root.best_move
+
+
+def new_frame(game: Any, parent: Frame, move: Any) -> Frame:
+    """
+    Return the frame of the state after move from the state of parent,
+    with its score if TABLE has it or the game is over there.
+    """
+    stats = SEARCH.stats
+    child = Frame(parent.state.make_move(move), parent, move)
+    key = TABLE.key_of(child.state)
+    child.score = TABLE.get(key)
+    if child.score is None and game.is_over(child.state):
+        child.score = result(child.state)
+        TABLE.put(key, child.score)
+        if stats is not None:
+            stats.terminal(child.ply)
+    if stats is not None:
+        stats.make_moves += 1
+        if child.score is None:
+            stats.expand(child.ply, len(child.state.get_possible_moves()))
+    return child
+
+
+def update_parent(frame: Frame) -> None:
+    """
+    Fold the score of the solved frame into the score of its parent.
+    """
+    parent = frame.parent
+    if parent.score is None or -1 * frame.score > parent.score:
+        parent.score = -1 * frame.score
+        parent.best_move = frame.move
+
+
 def get_index(atree: Tree) -> Union[None, int]:
     """
     Get atree's children index as needed. Otherwise, return None.
@@ -159,6 +950,7 @@ def creat_new_items(my_stack: Stack, a: Tree) -> None:
     empty = []
     for i in a.state.get_possible_moves():
         childrens = Tree(a.state.make_move(i))
+        childrens.depth = a.depth + 1
         a.children.append(childrens)
         empty.append(childrens)
     my_stack.add(a)
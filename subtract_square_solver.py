@@ -0,0 +1,88 @@
+"""
+A bottom-up solver for Subtract Square.
+
+The value of a Subtract Square state only depends on its current total, so
+every total up to some limit can be solved at once and looked up afterwards.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+
+
+class SubtractSquareSolver:
+    """
+    The win/loss table of Subtract Square for every total up to limit.
+
+    Attribute:
+    limit: the largest total solved
+    wins: wins[n] is 1 if the player to move at total n can force a win,
+          and 0 otherwise
+    """
+    limit: int
+    wins: bytearray
+
+    def __init__(self, limit: int) -> None:
+        """
+        Solve every total from 0 to limit.
+
+        Each losing total marks every total a square above it as winning, so
+        building the table takes O(limit * sqrt(limit)) steps at most.
+
+        >>> solver = SubtractSquareSolver(10)
+        >>> [n for n in range(11) if not solver.wins[n]]
+        [0, 2, 5, 7, 10]
+        """
+        self.limit = limit
+        self.wins = bytearray(limit + 1)
+        for n in range(limit + 1):
+            if not self.wins[n]:
+                k = 1
+                while n + k * k <= limit:
+                    self.wins[n + k * k] = 1
+                    k += 1
+
+    def is_win(self, total: int) -> bool:
+        """
+        Return whether the player to move at total can force a win.
+
+        Precondition: 0 <= total <= self.limit
+
+        >>> SubtractSquareSolver(10).is_win(9)
+        True
+        """
+        return self.wins[total] == 1
+
+    def best_move(self, total: int) -> int:
+        """
+        Return a square to subtract from total that leaves the opponent in a
+        losing position, or 1 if there is none.
+
+        Precondition: 0 < total <= self.limit
+
+        >>> SubtractSquareSolver(20).best_move(14)
+        4
+        >>> SubtractSquareSolver(20).best_move(12)
+        1
+        """
+        k = 1
+        while k * k <= total:
+            if not self.wins[total - k * k]:
+                return k * k
+            k += 1
+        return 1
+
+
+SOLVER = SubtractSquareSolver(1000)
+
+
+def get_solver(total: int) -> SubtractSquareSolver:
+    """
+    Return a shared solver that covers total, solving more totals first if
+    needed.
+
+    >>> get_solver(5000).limit >= 5000
+    True
+    """
+    global SOLVER
+    if total > SOLVER.limit:
+        SOLVER = SubtractSquareSolver(max(total, 2 * SOLVER.limit))
+    return SOLVER
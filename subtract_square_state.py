@@ -3,8 +3,10 @@ An implementation of a state for SubtractSquare.
 
 NOTE: You do not have to run python-ta on this file.
 """
+import math
 from typing import Any
 from game_state import GameState
+from zobrist import TURN_KEY, number_key
 
 
 class SubtractSquareState(GameState):
@@ -19,6 +21,11 @@ class SubtractSquareState(GameState):
         """
         super().__init__(is_p1_turn)
         self.current_total = current_total
+        # moves applied by apply_move, most recent last
+        self.history = None
+        self.zobrist = number_key(current_total)
+        if is_p1_turn:
+            self.zobrist ^= TURN_KEY
 
     def __str__(self) -> str:
         """
@@ -29,13 +36,11 @@ class SubtractSquareState(GameState):
     def get_possible_moves(self) -> list:
         """
         Return all possible moves that can be applied to this state.
-        """
-        moves = []
-        for i in range(1, self.current_total + 1):
-            if i ** 2 <= self.current_total:
-                moves.append(i ** 2)
 
-        return moves
+        >>> SubtractSquareState(True, 17).get_possible_moves()
+        [1, 4, 9, 16]
+        """
+        return get_squares(self.current_total)
 
     def make_move(self, move: Any) -> "SubtractSquareState":
         """
@@ -48,6 +53,38 @@ class SubtractSquareState(GameState):
                                         self.current_total - move)
         return new_state
 
+    def apply_move(self, move: Any) -> None:
+        """
+        Apply move to self in place, so that undo_move can take it back.
+
+        >>> state = SubtractSquareState(True, 10)
+        >>> state.apply_move(9)
+        >>> state
+        P1's Turn: False - Total: 1
+        >>> state.undo_move()
+        >>> state
+        P1's Turn: True - Total: 10
+        """
+        if type(move) == str:
+            move = int(move)
+        if self.history is None:
+            self.history = []
+        self.history.append(move)
+        self.zobrist ^= (number_key(self.current_total)
+                         ^ number_key(self.current_total - move) ^ TURN_KEY)
+        self.current_total -= move
+        self.p1_turn = not self.p1_turn
+
+    def undo_move(self) -> None:
+        """
+        Take back the last move applied to self by apply_move.
+        """
+        move = self.history.pop()
+        self.zobrist ^= (number_key(self.current_total)
+                         ^ number_key(self.current_total + move) ^ TURN_KEY)
+        self.current_total += move
+        self.p1_turn = not self.p1_turn
+
     def __repr__(self) -> str:
         """
         Return a representation of this state (which can be used for
@@ -56,6 +93,34 @@ class SubtractSquareState(GameState):
         return "P1's Turn: {} - Total: {}".format(self.p1_turn,
                                                   self.current_total)
 
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether self and other are the same position.
+
+        >>> SubtractSquareState(True, 10).make_move(1) == \\
+        ...     SubtractSquareState(True, 18).make_move(9)
+        True
+        """
+        return (type(self) == type(other)
+                and self.p1_turn == other.p1_turn
+                and self.current_total == other.current_total)
+
+    def __hash__(self) -> int:
+        """
+        Return the Zobrist hash of self.
+        """
+        return self.zobrist
+
+    def get_key(self) -> int:
+        """
+        Return the 64-bit Zobrist hash of self as its key.
+
+        >>> SubtractSquareState(True, 10).get_key() == \\
+        ...     SubtractSquareState(True, 10).get_key()
+        True
+        """
+        return self.zobrist
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -63,13 +128,82 @@ class SubtractSquareState(GameState):
         """
         if is_pos_square(self.current_total):
             return self.WIN
-        elif all([is_pos_square(self.current_total - n ** 2)
-                  for n in range(1, self.current_total + 1)
-                  if n ** 2 < self.current_total]):
+        elif all(is_pos_square(self.current_total - square)
+                 for square in get_squares(self.current_total)
+                 if square < self.current_total):
             return self.LOSE
 
         return self.DRAW
 
+    def is_terminal(self) -> bool:
+        """
+        Return whether the game is over at this state.
+
+        >>> SubtractSquareState(True, 0).is_terminal()
+        True
+        """
+        return self.current_total == 0
+
+    def winner(self) -> Any:
+        """
+        Return the name of the player who has won at this state, or None if
+        nobody has won. The player who subtracted to 0 wins.
+
+        >>> SubtractSquareState(True, 0).winner()
+        'p2'
+        >>> SubtractSquareState(True, 4).winner() is None
+        True
+        """
+        if self.current_total != 0:
+            return None
+        return 'p2' if self.p1_turn else 'p1'
+
+    def winning_moves(self) -> list:
+        """
+        Return the possible moves that win the game for the current player
+        at once.
+
+        >>> SubtractSquareState(True, 9).winning_moves()
+        [9]
+        >>> SubtractSquareState(True, 8).winning_moves()
+        []
+        """
+        if is_pos_square(self.current_total):
+            return [self.current_total]
+        return []
+
+
+# SQUARES[i] is (i + 1) ** 2, and SQUARE_SET holds the same squares. Both
+# are grown by grow_squares as larger totals come up, and shared by every
+# state. is_pos_square only uses math.isqrt past the squares cached.
+SQUARES = [1]
+SQUARE_SET = {1}
+
+
+def grow_squares(total: int) -> None:
+    """
+    Extend SQUARES and SQUARE_SET with every square up to total.
+    """
+    for root in range(len(SQUARES) + 1, math.isqrt(total) + 1):
+        SQUARES.append(root * root)
+        SQUARE_SET.add(root * root)
+
+
+def get_squares(total: int) -> list:
+    """
+    Return a new list of the positive squares up to total, in increasing
+    order.
+
+    >>> get_squares(10)
+    [1, 4, 9]
+    >>> get_squares(0)
+    []
+    """
+    count = math.isqrt(total) if total > 0 else 0
+    if count > len(SQUARES):
+        grow_squares(total)
+    return SQUARES[:count]
+
 
 def is_pos_square(n: int) -> bool:
     """
@@ -79,8 +213,12 @@ def is_pos_square(n: int) -> bool:
     False
     >>> is_pos_square(9)
     True
+    >>> is_pos_square(10 ** 40)
+    True
     """
-    return 0 < n and (round(n ** 0.5) ** 2 == n)
+    if n < (len(SQUARES) + 1) ** 2:
+        return n in SQUARE_SET
+    return math.isqrt(n) ** 2 == n
 
 
 if __name__ == "__main__":
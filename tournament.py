@@ -0,0 +1,165 @@
+"""
+Play many bot-versus-bot games without any input or printing.
+
+Example, 200 games of Stonehenge with side length 2, iterative deepening
+against rough outcome, on 4 processes:
+
+    python tournament.py h mt ro --params 2 --games 200 --workers 4
+        --p1-option time_limit=0.05
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import ast
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game_interface import playable_games, usable_strategies, \
+    interactive_strategy
+
+
+def play_game(game_key: str, params: tuple, p1_key: str, p2_key: str,
+              p1_starts: bool = True, p1_options: dict = None,
+              p2_options: dict = None) -> dict:
+    """
+    Play one game of playable_games[game_key], built with params, between
+    the strategies usable_strategies[p1_key] and usable_strategies[p2_key].
+
+    Return the winner ('p1', 'p2' or None for a tie), the number of moves
+    and the seconds each player took for each move.
+
+    >>> result = play_game('s', (11,), 'sq', 'ro')
+    >>> (result['winner'], result['moves'], len(result['latencies']['p1']))
+    ('p1', 5, 3)
+    """
+    game = playable_games[game_key](p1_starts, *params)
+    strategies = {'p1': (usable_strategies[p1_key], p1_options or {}),
+                  'p2': (usable_strategies[p2_key], p2_options or {})}
+    latencies = {'p1': [], 'p2': []}
+    moves = 0
+    current_state = game.current_state
+    while not game.is_over(current_state):
+        player = current_state.get_current_player_name()
+        current_strategy, options = strategies[player]
+        start = time.perf_counter()
+        move = current_strategy(game, **options)
+        latencies[player].append(time.perf_counter() - start)
+        if not current_state.is_valid_move(move):
+            raise ValueError('{} made the invalid move {}'.format(player,
+                                                                  move))
+        game.current_state = current_state.make_move(move)
+        current_state = game.current_state
+        moves += 1
+
+    winner = None
+    if game.is_winner('p1'):
+        winner = 'p1'
+    elif game.is_winner('p2'):
+        winner = 'p2'
+    return {'winner': winner, 'moves': moves, 'latencies': latencies}
+
+
+def play_indexed_game(args: tuple) -> dict:
+    """
+    Return play_game(*args). Used to map games over a process pool.
+    """
+    return play_game(*args)
+
+
+def percentiles(values: list) -> dict:
+    """
+    Return the 50th, 90th and 99th percentiles and the maximum of values,
+    using the nearest rank.
+
+    >>> percentiles([0.1, 0.2, 0.3, 0.4])
+    {'p50': 0.2, 'p90': 0.4, 'p99': 0.4, 'max': 0.4}
+    """
+    if values == []:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    ordered = sorted(values)
+    result = {}
+    for name, fraction in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        rank = max(1, math.ceil(len(ordered) * fraction))
+        result[name] = ordered[rank - 1]
+    result['max'] = ordered[-1]
+    return result
+
+
+def run_tournament(game_key: str, params: tuple, p1_key: str, p2_key: str,
+                   games: int = 100, workers: int = None,
+                   alternate: bool = True, p1_options: dict = None,
+                   p2_options: dict = None) -> dict:
+    """
+    Play games games on a pool of workers processes and return the wins,
+    draws and losses of the p1 strategy, per-move latency percentiles of
+    both strategies, and the throughput.
+
+    If alternate is True, p2 moves first in every other game.
+
+    >>> summary = run_tournament('s', (10,), 'sq', 'ro', games=4, workers=1)
+    >>> (summary['wins'], summary['draws'], summary['losses'])
+    (2, 0, 2)
+    """
+    for key in [p1_key, p2_key]:
+        if usable_strategies[key] is interactive_strategy:
+            raise ValueError('strategy {} needs a human player'.format(key))
+    jobs = [(game_key, tuple(params), p1_key, p2_key,
+             not alternate or i % 2 == 0, p1_options, p2_options)
+            for i in range(games)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(play_indexed_game, jobs))
+    seconds = time.perf_counter() - start
+
+    latencies = {'p1': [], 'p2': []}
+    for result in results:
+        for player in latencies:
+            latencies[player].extend(result['latencies'][player])
+    total_moves = sum(result['moves'] for result in results)
+    return {'game': game_key, 'params': list(params),
+            'p1': p1_key, 'p2': p2_key, 'games': games,
+            'wins': sum(result['winner'] == 'p1' for result in results),
+            'draws': sum(result['winner'] is None for result in results),
+            'losses': sum(result['winner'] == 'p2' for result in results),
+            'latency': {player: percentiles(latencies[player])
+                        for player in latencies},
+            'seconds': seconds,
+            'games_per_second': games / seconds,
+            'moves_per_second': total_moves / seconds}
+
+
+def parse_options(pairs: list) -> dict:
+    """
+    Return the keyword options given as name=value strings.
+
+    >>> parse_options(['time_limit=0.5', 'bounded=True'])
+    {'time_limit': 0.5, 'bounded': True}
+    """
+    options = {}
+    for pair in pairs:
+        name, value = pair.split('=', 1)
+        options[name] = ast.literal_eval(value)
+    return options
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('game', choices=sorted(playable_games))
+    parser.add_argument('p1', choices=sorted(usable_strategies))
+    parser.add_argument('p2', choices=sorted(usable_strategies))
+    parser.add_argument('--params', nargs='*', type=int, default=[],
+                        help='arguments for the game, such as the side '
+                             'length or the starting total')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-alternate', action='store_true',
+                        help='let p1 move first in every game')
+    parser.add_argument('--p1-option', action='append', default=[])
+    parser.add_argument('--p2-option', action='append', default=[])
+    args = parser.parse_args()
+    print(json.dumps(run_tournament(
+        args.game, tuple(args.params), args.p1, args.p2, args.games,
+        args.workers, not args.no_alternate, parse_options(args.p1_option),
+        parse_options(args.p2_option)), indent=2))
@@ -0,0 +1,140 @@
+"""
+A bounded transposition table shared by the minimax strategies.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TranspositionTable:
+    """
+    A cache from state keys to search results, with least-recently-used
+    eviction once max_size entries are stored.
+
+    Attribute:
+    max_size: the largest number of entries kept
+    canonical: whether states are keyed by get_canonical_key, so that
+               symmetric positions share an entry
+    hits: number of lookups that found an entry
+    misses: number of lookups that found nothing
+    evictions: number of entries dropped to make room
+    """
+    max_size: int
+    canonical: bool
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_size: int = 500000,
+                 canonical: bool = False) -> None:
+        """
+        Initialize an empty table holding at most max_size entries.
+
+        >>> table = TranspositionTable(10)
+        >>> len(table)
+        0
+        """
+        self.max_size = max_size
+        self.canonical = canonical
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in self.
+        """
+        return len(self._entries)
+
+    def key_of(self, state: Any) -> Hashable:
+        """
+        Return the key self stores results for state under.
+
+        Only use canonical keys for results that are the same for every
+        symmetric position, such as scores.
+        """
+        if self.canonical:
+            return state.get_canonical_key()
+        return state.get_key()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value stored for key, or default if there is none.
+
+        >>> table = TranspositionTable(10)
+        >>> table.put('a', 1)
+        >>> table.get('a')
+        1
+        >>> table.get('b') is None
+        True
+        >>> (table.hits, table.misses)
+        (1, 1)
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value stored for key, or default if there is none, without
+        counting the lookup or refreshing the entry.
+
+        >>> table = TranspositionTable(10)
+        >>> table.put('a', 1)
+        >>> table.peek('a')
+        1
+        >>> table.hits
+        0
+        """
+        return self._entries.get(key, default)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store value for key, evicting the least recently used entry if self
+        is full.
+
+        >>> table = TranspositionTable(2)
+        >>> table.put('a', 1)
+        >>> table.put('b', 2)
+        >>> _ = table.get('a')
+        >>> table.put('c', 3)
+        >>> table.get('b') is None
+        True
+        >>> table.evictions
+        1
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the counters of self.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return the size and counters of self, for sizing the table.
+
+        >>> table = TranspositionTable(10)
+        >>> table.stats()['hit_rate']
+        0.0
+        """
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
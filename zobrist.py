@@ -0,0 +1,47 @@
+"""
+Zobrist keys for hashing game states.
+
+Keys come from a fixed seed, so a state hashes to the same 64-bit value in
+every process and every run.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import random
+
+SEED = 2018
+MASK = (1 << 64) - 1
+
+# Mixed into the hash of a state whenever it is p1's turn.
+TURN_KEY = random.Random(SEED).getrandbits(64)
+
+
+def random_keys(count: int, salt: int) -> list:
+    """
+    Return a list of count random 64-bit keys, the same for every call with
+    the same salt.
+
+    >>> random_keys(3, 1) == random_keys(3, 1)
+    True
+    >>> random_keys(3, 1) == random_keys(3, 2)
+    False
+    """
+    generator = random.Random(SEED * 1000003 + salt)
+    return [generator.getrandbits(64) for _ in range(count)]
+
+
+def number_key(n: int) -> int:
+    """
+    Return a 64-bit key for the non-negative integer n.
+
+    This is the splitmix64 finalizer, so keys for unbounded numbers need no
+    table.
+
+    >>> number_key(5) == number_key(5)
+    True
+    >>> number_key(5) == number_key(6)
+    False
+    """
+    n = (n + 0x9e3779b97f4a7c15) & MASK
+    n = ((n ^ (n >> 30)) * 0xbf58476d1ce4e5b9) & MASK
+    n = ((n ^ (n >> 27)) * 0x94d049bb133111eb) & MASK
+    return n ^ (n >> 31)